@@ -3,11 +3,103 @@
 Apply gain calibration solutions using DP3
 """
 
+import atexit
+import shutil
 import subprocess
 import sys
-import os
 from pathlib import Path
 
+# Long-lived DP3 containers, keyed by their (/in, /out, /sol) host mounts
+_containers = {}
+
+def _get_container(in_dir, out_dir, sol_dir):
+    """
+    Start (once) a detached linc container for these directories and return its ID
+    
+    Only the directories DP3 needs are mounted: the input MS directory as
+    /in and the solution directory as /sol (both read-only), and the
+    output directory as /out.
+    """
+    key = (str(in_dir), str(out_dir), str(sol_dir))
+    if key not in _containers:
+        _containers[key] = subprocess.check_output([
+            "podman", "run", "-d", "--rm",
+            "--entrypoint", "sleep",
+            "-v", f"{in_dir}:/in:ro",
+            "-v", f"{out_dir}:/out",
+            "-v", f"{sol_dir}:/sol:ro",
+            "-w", "/out",
+            "astronrd/linc:latest", "infinity"
+        ], text=True).strip()
+    return _containers[key]
+
+def _stop_containers():
+    """Remove all containers started by _get_container"""
+    for container_id in _containers.values():
+        subprocess.run(["podman", "rm", "-f", container_id],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _containers.clear()
+
+atexit.register(_stop_containers)
+
+def retile_ms(ms_path, baselines_per_tile=None, tile_bytes=1024 * 1024):
+    """
+    Rewrite the visibility columns of an MS with baseline-sized row tiles
+    
+    casacore's default TiledColumnStMan tiles span many rows, which is slow
+    when DP3/WSClean iterate per baseline. Each tile here holds the full
+    (pol, chan) cube for only a few baselines (rows).
+    
+    The MS is swapped in with renames only: the original is moved aside,
+    the re-tiled copy is moved into place, and only then is the original
+    deleted, so an interruption never leaves ms_path missing.
+    
+    Args:
+        ms_path: Path to the measurement set (rewritten in place)
+        baselines_per_tile: Baselines per tile (optional, defaults to as many
+                            as fit in tile_bytes, clamped to 4-8)
+        tile_bytes: Target tile size in bytes for the default
+    """
+    import numpy as np
+    from casacore import tables
+    
+    ms_path = Path(ms_path)
+    with tables.table(str(ms_path), ack=False) as t:
+        nchan, npol = t.getcell('DATA', 0).shape
+        columns = [c for c in ('DATA', 'MODEL_DATA', 'CORRECTED_DATA')
+                   if c in t.colnames()]
+        ant1 = t.getcol('ANTENNA1')
+        ant2 = t.getcol('ANTENNA2')
+    nbaselines = np.unique(ant1.astype(np.int64) * (ant2.max() + 1) + ant2).size
+    
+    # complex64 visibilities: 8 bytes per (chan, pol) sample
+    if baselines_per_tile is None:
+        baselines_per_tile = int(np.clip(tile_bytes // (nchan * npol * 8), 4, 8))
+    nrows_per_tile = max(1, min(baselines_per_tile, nbaselines))
+    
+    dminfo = {}
+    for i, column in enumerate(columns):
+        dminfo[f'*{i + 1}'] = {
+            'TYPE': 'TiledColumnStMan',
+            'NAME': f'Tiled{column}',
+            'SPEC': {'DEFAULTTILESHAPE': [npol, nchan, nrows_per_tile],
+                     'MaxCacheSize': 0},
+            'COLUMNS': [column],
+        }
+    
+    print(f"Re-tiling {ms_path.name}: {columns} with tile shape "
+          f"[{npol}, {nchan}, {nrows_per_tile}] ({nbaselines} baselines)")
+    
+    retiled = ms_path.with_name(ms_path.name + '.retile')
+    original = ms_path.with_name(ms_path.name + '.orig')
+    if retiled.exists():
+        shutil.rmtree(retiled)  # left over from an interrupted run
+    tables.tablecopy(str(ms_path), str(retiled), deep=True, valuecopy=True,
+                     dminfo=dminfo)
+    ms_path.rename(original)
+    retiled.rename(ms_path)
+    shutil.rmtree(original)
+
 def run_applycal(input_ms, solution_file, output_ms=None):
     """Apply gain calibration solutions using DP3"""
     
@@ -32,43 +124,36 @@ def run_applycal(input_ms, solution_file, output_ms=None):
     
     print(f"Applying calibration: {input_ms} -> {output_ms}")
     
-    # Find common parent for volume mounting
-    common_parent = Path(os.path.commonpath([
-        input_path.parent, solution_path.parent, output_ms.parent
-    ]))
+    # Each file's own (symlink-resolved) directory is mounted separately
+    in_dir = input_path.resolve().parent
+    out_dir = output_ms.resolve().parent
+    sol_dir = solution_path.resolve().parent
     
     # Create DP3 parset
-    parset_content = f"""msin = /data/{input_path.relative_to(common_parent)}
-msout = /data/{output_ms.relative_to(common_parent)}
+    parset_content = f"""msin = /in/{input_path.resolve().name}
+msout = /out/{output_ms.resolve().name}
 steps = [applycal]
 applycal.type = applycal
-applycal.parmdb = /data/{solution_path.relative_to(common_parent)}
+applycal.parmdb = /sol/{solution_path.resolve().name}
 applycal.correction = phase000
 """
     
-    # Write and run DP3
-    parset_file = Path("applycal.parset")
+    # Run DP3, with the parset piped over stdin: no parset file is written,
+    # so concurrent runs cannot clobber each other's
     try:
-        with open(parset_file, 'w') as f:
-            f.write(parset_content)
-        
+        # Reuse one running container instead of paying podman run per call
+        container_id = _get_container(in_dir, out_dir, sol_dir)
         cmd = [
-            "podman", "run", "--rm",
-            "-v", f"{common_parent}:/data",
-            "-v", f"{Path.cwd()}:/config",
-            "-w", "/config",
-            "astronrd/linc:latest",
-            "DP3", f"/config/{parset_file.name}"
+            "podman", "exec", "-i", container_id,
+            "DP3", "/dev/stdin"
         ]
         
-        subprocess.run(cmd, check=True)
+        subprocess.run(cmd, input=parset_content, text=True, check=True)
         print(f"✓ Calibration applied: {output_ms}")
         
     except subprocess.CalledProcessError as e:
         print(f"✗ DP3 failed with exit code {e.returncode}")
         sys.exit(1)
-    finally:
-        parset_file.unlink(missing_ok=True)
 
 def main():
     if len(sys.argv) < 3:
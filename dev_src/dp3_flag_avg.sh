@@ -16,10 +16,8 @@ if [ ! -d "$INPUT_MS" ]; then
     exit 1
 fi
 
-# Create temporary parset file
-PARSET_FILE="dp3_flag_avg_$$.parset"
-
-cat > "$PARSET_FILE" << EOF
+# DP3 parset, streamed to the container over stdin (no file in CWD)
+PARSET=$(cat << EOF
 msin.type = ms
 msin.name = /data/$(basename "$INPUT_MS")
 
@@ -37,20 +35,17 @@ flag.strategy = /usr/local/share/linc/rfistrategies/lofar-default.lua
 avg.type = averager
 avg.freqstep = 3
 EOF
+)
 
 echo "Running DP3 with aoflagger and frequency averaging..."
 echo "Input: $INPUT_MS"
 echo "Output: $OUTPUT_MS"
 
 # Run DP3 via podman
-podman run --rm \
+podman run --rm -i \
     -v "$(dirname "$INPUT_MS"):/data" \
     -v "$(dirname "$OUTPUT_MS"):/data" \
-    -v "$(pwd):/config" \
     astronrd/linc:latest \
-    DP3 "/config/$PARSET_FILE"
-
-# Clean up
-rm -f "$PARSET_FILE"
+    DP3 /dev/stdin <<< "$PARSET"
 
 echo "Done!"
@@ -36,10 +36,8 @@ echo "Output: $OUTPUT_MS"
 echo "Solution interval: $SOLINT (0=per scan)"
 echo "Calibration type: $CALTYPE"
 
-# Create temporary parset file
-PARSET_FILE="gaincal_$$.parset"
-
-cat > "$PARSET_FILE" << EOF
+# DP3 parset, streamed to the container over stdin (no file in CWD)
+PARSET=$(cat << EOF
 msin = /data/$(basename "$INPUT_MS")
 msout = /data/$(basename "$OUTPUT_MS")
 msout.writefullresflag = true
@@ -58,16 +56,17 @@ cal.tolerance = 1e-3
 cal.usemodelcolumn = true
 cal.modelcolumn = MODEL_DATA
 EOF
+)
 
 echo "Running DP3 gain calibration..."
 
 # Run DP3 via podman
-podman run --rm \
+podman run --rm -i \
     -v "$(dirname "$INPUT_MS"):/data" \
     -v "$(pwd):/config" \
     -w "/config" \
     astronrd/linc:latest \
-    DP3 "/config/$PARSET_FILE"
+    DP3 /dev/stdin <<< "$PARSET"
 
 if [ $? -eq 0 ]; then
     echo "DP3 gain calibration completed successfully!"
@@ -80,10 +79,7 @@ if [ $? -eq 0 ]; then
     fi
 else
     echo "DP3 gain calibration failed!"
-    rm -f "$PARSET_FILE"
     exit 1
 fi
 
-# Clean up
-rm -f "$PARSET_FILE"
 echo "Done!"
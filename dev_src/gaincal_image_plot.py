@@ -4,15 +4,112 @@ Complete pipeline script: gain calibration -> imaging -> plotting
 Runs the full sequence on measurement set data
 """
 
+import importlib
+import logging
+import logging.handlers
+import multiprocessing
+import queue
+import shutil
 import subprocess
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+logger = logging.getLogger("gaincal_image_plot")
+
+def _start_logging(log_file):
+    """
+    Route the pipeline logger through a queue to console and a buffered log file
+    
+    The handlers run in a QueueListener thread, so progress messages never
+    block the pipeline on slow stdout or network-filesystem writes.
+    Returns the listener; call .stop() to flush and close.
+    """
+    log_queue = queue.Queue(-1)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter("%(message)s"))
+    logfile = logging.StreamHandler(open(log_file, "a", buffering=65536, encoding="utf-8"))
+    logfile.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    
+    listener = logging.handlers.QueueListener(log_queue, console, logfile)
+    listener.start()
+    return listener
+
+def _load_step(module_name, func_name):
+    """
+    Import a pipeline step function from the scripts in the current directory
+    
+    Returns None if the module cannot be imported, so the caller can fall
+    back to running the script as a subprocess.
+    """
+    cwd = str(Path.cwd())
+    if cwd not in sys.path:
+        sys.path.insert(0, cwd)
+    try:
+        return getattr(importlib.import_module(module_name), func_name)
+    except (ImportError, AttributeError) as e:
+        logger.info(f"ℹ️  Could not import {module_name}.{func_name} ({e}), using subprocess")
+        return None
+
+def _run_step(func, args, fallback_cmd, kwargs=None):
+    """
+    Run a pipeline step in-process, or as a subprocess if func is None
+    
+    Raises subprocess.CalledProcessError on failure in both cases, since the
+    step scripts report errors via sys.exit().
+    """
+    if func is None:
+        subprocess.run(fallback_cmd, check=True, text=True)
+        return
+    try:
+        func(*args, **(kwargs or {}))
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            returncode = e.code if isinstance(e.code, int) else 1
+            raise subprocess.CalledProcessError(returncode, fallback_cmd)
+
+def _default_temp_dir(min_free_gb=10):
+    """Return a per-process wsclean scratch dir on /dev/shm if it has enough free space"""
+    shm = Path("/dev/shm")
+    if shm.is_dir() and shutil.disk_usage(shm).free >= min_free_gb * 1024**3:
+        return shm / f"wsclean_{os.getpid()}"
+    return None
+
+def _choose_channels_out(ms_path):
+    """
+    Pick a wsclean -channels-out from the MS channel count
+    
+    Uses a quarter of the total channel count over all spectral windows
+    (about 4 channels per output image), rounded down to a divisor of the
+    total so every output image gets the same number of channels.
+    Returns None if the MS cannot be inspected.
+    """
+    try:
+        from casacore import tables
+        with tables.table(f"{ms_path}/SPECTRAL_WINDOW", ack=False) as spw:
+            num_chan = spw.getcol("NUM_CHAN")
+    except Exception as e:
+        logger.info(f"ℹ️  Could not read spectral windows ({e}), using wsclean default channels-out")
+        return None
+    
+    total_chan = int(sum(num_chan))
+    channels_out = max(1, total_chan // 4)
+    while total_chan % channels_out:
+        channels_out -= 1
+    return channels_out
+
 def run_pipeline(input_ms, output_prefix="calibrated"):
     """
     Run complete pipeline: gaincal -> imaging -> plotting
     
+    Progress is logged to stdout and to <output_prefix>_pipeline.log next
+    to the input MS.
+    
     Args:
         input_ms: Path to input measurement set (with MODEL_DATA filled)
         output_prefix: Prefix for output files
@@ -24,9 +121,23 @@ def run_pipeline(input_ms, output_prefix="calibrated"):
         print(f"Error: Input measurement set not found: {input_ms}")
         sys.exit(1)
     
-    print("="*60)
-    print("STEP 1: Running gain calibration...")
-    print("="*60)
+    listener = _start_logging(input_path.parent / f"{output_prefix}_pipeline.log")
+    try:
+        _run_pipeline(input_path, output_prefix)
+    finally:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.flush()
+            if handler.stream is not sys.stdout:
+                handler.stream.close()
+
+def _run_pipeline(input_path, output_prefix):
+    """Pipeline steps for run_pipeline, run with logging set up"""
+    input_ms = str(input_path)
+    
+    logger.info("="*60)
+    logger.info("STEP 1: Running gain calibration...")
+    logger.info("="*60)
     
     # Step 1: Run gain calibration
     cal_ms = input_path.parent / f"{output_prefix}_cal.ms"
@@ -38,90 +149,129 @@ def run_pipeline(input_ms, output_prefix="calibrated"):
     ]
     
     try:
-        result = subprocess.run(gaincal_cmd, check=True, text=True)
-        print(f"✓ Gain calibration completed: {cal_ms}")
+        _run_step(_load_step("run_gaincal", "run_gaincal"),
+                  (str(input_ms), str(cal_ms)), gaincal_cmd)
+        logger.info(f"✓ Gain calibration completed: {cal_ms}")
     except subprocess.CalledProcessError as e:
-        print(f"✗ Gain calibration failed with exit code {e.returncode}")
+        logger.error(f"✗ Gain calibration failed with exit code {e.returncode}")
         sys.exit(1)
     
-    print("\n" + "="*60)
-    print("STEP 2: Running wsclean imaging...")
-    print("="*60)
+    logger.info("="*60)
+    logger.info("STEP 2: Running wsclean imaging...")
+    logger.info("="*60)
+    
+    # Re-tile the calibrated MS for baseline-ordered access before imaging
+    retile_ms = _load_step("applycal_dp3", "retile_ms")
+    if retile_ms is not None:
+        try:
+            retile_ms(cal_ms)
+        except Exception as e:
+            logger.info(f"ℹ️  Skipping MS re-tiling: {e}")
     
     # Step 2: Run wsclean imaging on calibrated data
     image_prefix = f"{output_prefix}_image"
     
+    # Keep wsclean scratch files in RAM when there is room for them
+    temp_dir = _default_temp_dir()
+    
     wsclean_cmd = [
         "python3", "run_wsclean_imaging.py",
         str(cal_ms),
-        image_prefix
+        image_prefix,
+        "--no-update-model"
     ]
+    if temp_dir is not None:
+        wsclean_cmd.extend(["--temp-dir", str(temp_dir)])
+    channels_out = _choose_channels_out(cal_ms)
+    if channels_out is not None:
+        wsclean_cmd.extend(["--channels-out", str(channels_out)])
     
     try:
-        result = subprocess.run(wsclean_cmd, check=True, text=True)
-        print(f"✓ WSClean imaging completed with prefix: {image_prefix}")
+        _run_step(_load_step("run_wsclean_imaging", "run_wsclean_imaging"),
+                  (str(cal_ms), image_prefix), wsclean_cmd,
+                  kwargs={"no_update_model": True, "temp_dir": temp_dir,
+                          "channels_out": channels_out})
+        logger.info(f"✓ WSClean imaging completed with prefix: {image_prefix}")
     except subprocess.CalledProcessError as e:
-        print(f"✗ WSClean imaging failed with exit code {e.returncode}")
+        logger.error(f"✗ WSClean imaging failed with exit code {e.returncode}")
         sys.exit(1)
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
     
-    print("\n" + "="*60)
-    print("STEP 3: Plotting gain solutions...")
-    print("="*60)
+    logger.info("="*60)
+    logger.info("STEPS 3-4: Plotting gain solutions and FITS images...")
+    logger.info("="*60)
     
-    # Step 3a: Plot gain solutions if solution.h5 exists
+    # Steps 3 and 4 only depend on steps 1-2, so they run concurrently.
+    # Step functions are imported here, on the main thread.
+    plot_steps = {}
+    
+    # Step 3: Plot gain solutions if solution.h5 exists
     solution_file = input_path.parent / "solution.h5"
     if solution_file.exists():
         solution_cmd = [
             "python3", "plot_solutions.py",
             str(solution_file)
         ]
-        
-        try:
-            result = subprocess.run(solution_cmd, check=True, text=True)
-            print(f"✓ Gain solution plotting completed")
-        except subprocess.CalledProcessError as e:
-            print(f"✗ Gain solution plotting failed with exit code {e.returncode}")
+        plot_steps["Gain solution plotting"] = (
+            _load_step("plot_solutions", "plot_solutions"),
+            (str(solution_file),), solution_cmd)
     else:
-        print("ℹ️  No solution.h5 file found, skipping gain solution plots")
-    
-    print("\n" + "="*60)
-    print("STEP 4: Plotting FITS images...")
-    print("="*60)
+        logger.info("ℹ️  No solution.h5 file found, skipping gain solution plots")
     
     # Step 4: Plot the resulting FITS images
     plot_cmd = [
         "python3", "plot_fits.py",
         str(input_path.parent / image_prefix)
     ]
+    # Its process pool is started while plot_solutions and the log listener
+    # run in other threads: spawn the workers, as forking could copy a lock
+    # held by one of those threads and deadlock the child
+    plot_steps["FITS plotting"] = (
+        _load_step("plot_fits", "plot_all_fits"),
+        (str(input_path.parent / image_prefix),), plot_cmd,
+        {"mp_context": multiprocessing.get_context("spawn")})
     
-    try:
-        result = subprocess.run(plot_cmd, check=True, text=True)
-        print(f"✓ FITS plotting completed")
-    except subprocess.CalledProcessError as e:
-        print(f"✗ FITS plotting failed with exit code {e.returncode}")
-        print("Note: This may fail if matplotlib/astropy are not installed")
+    with ThreadPoolExecutor(max_workers=len(plot_steps)) as executor:
+        futures = {executor.submit(_run_step, *step): name
+                   for name, step in plot_steps.items()}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                future.result()
+                logger.info(f"✓ {name} completed")
+            except subprocess.CalledProcessError as e:
+                logger.error(f"✗ {name} failed with exit code {e.returncode}")
+                if name == "FITS plotting":
+                    logger.info("Note: This may fail if matplotlib/astropy are not installed")
     
-    print("\n" + "="*60)
-    print("PIPELINE COMPLETED SUCCESSFULLY!")
-    print("="*60)
+    logger.info("="*60)
+    logger.info("PIPELINE COMPLETED SUCCESSFULLY!")
+    logger.info("="*60)
     
     # Show generated files
-    print("\nGenerated files:")
+    logger.info("Generated files:")
     cal_dir = input_path.parent
     
     # List calibrated MS
     if cal_ms.exists():
-        print(f"  📁 Calibrated MS: {cal_ms}")
+        logger.info(f"  📁 Calibrated MS: {cal_ms}")
+    
+    # Scan the output directory once for both listings
+    with os.scandir(cal_dir) as entries:
+        image_files = sorted(e.name for e in entries
+                             if e.name.startswith(image_prefix) and e.is_file())
     
     # List FITS files
-    fits_files = list(cal_dir.glob(f"{image_prefix}*.fits"))
-    for fits_file in sorted(fits_files):
-        print(f"  🖼️  FITS: {fits_file.name}")
+    for name in image_files:
+        if name.endswith('.fits'):
+            logger.info(f"  🖼️  FITS: {name}")
     
     # List PNG files
-    png_files = list(cal_dir.glob(f"{image_prefix}*.png"))
-    for png_file in sorted(png_files):
-        print(f"  📊 Plot: {png_file.name}")
+    for name in image_files:
+        if name.endswith('.png'):
+            logger.info(f"  📊 Plot: {name}")
 
 def main():
     """Main function"""
@@ -0,0 +1,78 @@
+"""
+Helpers shared by the dev_src scripts that run tools in the LINC container
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# run_streaming is defined once, next to the pipeline script in the
+# repository root, and re-exported here for the dev_src scripts
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from subprocess_utils import run_streaming
+
+def _node_cpulist(numa_node):
+    """Return the cpulist (e.g. "0-23,48-71") of a NUMA node"""
+    return Path(f"/sys/devices/system/node/node{numa_node}/cpulist").read_text().strip()
+
+def available_cpus(numa_node=None):
+    """
+    Number of CPUs a containerised tool can use
+    
+    The CPUs of numa_node if given, otherwise the CPUs this process may run
+    on, which is what a --cpuset-cpus pinned container actually gets.
+    """
+    if numa_node is not None:
+        count = 0
+        for part in _node_cpulist(numa_node).split(","):
+            lo, _, hi = part.partition("-")
+            count += int(hi or lo) - int(lo) + 1
+        return count
+    affinity = getattr(os, "sched_getaffinity", None)
+    return len(affinity(0)) if affinity else (os.cpu_count() or 1)
+
+def podman_resource_args(numa_node=None, threads=None, memory=None):
+    """
+    Build podman run options that bound the container's CPU and memory use
+    
+    Args:
+        numa_node: Pin CPUs and memory allocation to this NUMA node (optional)
+        threads: CPU quota, also exported as OMP/OpenBLAS thread count (optional)
+        memory: Memory limit, e.g. "64g" (optional)
+    """
+    args = []
+    if numa_node is not None:
+        cpulist = _node_cpulist(numa_node)
+        args += [f"--cpuset-cpus={cpulist}", f"--cpuset-mems={numa_node}"]
+    if threads is not None:
+        args += [f"--cpus={threads}",
+                 "-e", f"OMP_NUM_THREADS={threads}",
+                 "-e", f"OPENBLAS_NUM_THREADS={threads}"]
+    if memory is not None:
+        args += [f"--memory={memory}"]
+    return args
+
+def image_ref():
+    """
+    Return the LINC image reference, pulling it only if not present locally
+    
+    Pinned by digest when LINC_IMAGE_DIGEST is set (e.g. "sha256:..."),
+    otherwise astronrd/linc:latest. Containers are then run with
+    --pull=never so no registry lookup happens per invocation.
+    """
+    digest = os.environ.get("LINC_IMAGE_DIGEST")
+    if digest:
+        if not digest.startswith("sha256:"):
+            digest = f"sha256:{digest}"
+        ref = f"astronrd/linc@{digest}"
+    else:
+        ref = "astronrd/linc:latest"
+    
+    if subprocess.run(["podman", "image", "exists", ref]).returncode != 0:
+        print(f"Pulling container image {ref}...")
+        try:
+            subprocess.run(["podman", "pull", ref], check=True)
+        except subprocess.CalledProcessError as e:
+            print(f"Failed to pull {ref} (exit code {e.returncode})")
+            sys.exit(1)
+    return ref
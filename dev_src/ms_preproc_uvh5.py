@@ -8,6 +8,8 @@ Usage:
 Examples:
     python ms_preproc_uvh5.py data.ms
     python ms_preproc_uvh5.py data.ms --output data.uvh5
+    python ms_preproc_uvh5.py data.ms --stream --chunk-rows 50000
+    python ms_preproc_uvh5.py data.ms --stream --verify
 
 Requires conda environment: conda activate /opt/devel/peijin/solarml
 """
@@ -16,8 +18,23 @@ import os
 import sys
 import argparse
 from pathlib import Path
+import numpy as np
 from pyuvdata import UVData
 
+# CASA Stokes enum (POLARIZATION/CORR_TYPE) -> AIPS polarization numbers
+CASA_TO_AIPS_POL = {
+    1: 1, 2: 2, 3: 3, 4: 4,           # I, Q, U, V
+    5: -1, 6: -3, 7: -4, 8: -2,       # RR, RL, LR, LL
+    9: -5, 10: -7, 11: -8, 12: -6,    # XX, XY, YX, YY
+}
+
+# FIELD PHASE_DIR MEASINFO reference -> (astropy frame, epoch)
+MS_DIR_REF_TO_FRAME = {
+    "J2000": ("fk5", 2000.0),
+    "B1950": ("fk4", 1950.0),
+    "ICRS": ("icrs", None),
+}
+
 def parse_arguments():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description="Convert MS file to UVH5 format")
@@ -25,6 +42,12 @@ def parse_arguments():
     parser.add_argument('--output', '-o', help='Output UVH5 file path', default=None)
     parser.add_argument('--force', '-f', action='store_true', help='Overwrite existing files')
     parser.add_argument('--verbose', '-v', action='store_true', help='Enable verbose output')
+    parser.add_argument('--stream', action='store_true',
+                        help='Stream row chunks with dask-ms + h5py instead of loading the whole MS')
+    parser.add_argument('--chunk-rows', type=int, default=50000,
+                        help='Rows per chunk when streaming (default: 50000)')
+    parser.add_argument('--verify', action='store_true',
+                        help='Read the output back and compare it with pyuvdata read_ms (loads the whole MS)')
     parser.add_argument('--version', action='version', version='%(prog)s 1.0.0')
     return parser.parse_args()
 
@@ -52,6 +75,189 @@ def ms_to_uvh5(in_ms, out_uvh5, verbose=False):
         print(f"Error during MS to UVH5 conversion: {e}")
         raise
 
+def ms_to_uvh5_streaming(in_ms, out_uvh5, chunk_rows=50000, verbose=False):
+    """
+    Convert MS file to UVH5 format by streaming row chunks.
+    
+    The UVH5 header is built once from the MS subtables, then DATA, FLAG and
+    the weights are copied chunk by chunk into preallocated HDF5 datasets,
+    so peak memory is bounded by chunk_rows rather than the MS size.
+    The header follows the current UVH5 layout (phase_center_catalog,
+    no spw axis), and nsamples comes from WEIGHT_SPECTRUM, or from WEIGHT
+    spread over the channels, as pyuvdata's read_ms does.
+    Only single spectral window MSes are supported.
+    
+    Args:
+        in_ms (str): Input MS file path
+        out_uvh5 (str): Output UVH5 file path
+        chunk_rows (int): Number of MS rows per chunk
+        verbose (bool): Enable verbose output
+    """
+    import h5py
+    from astropy import units as u
+    from astropy.coordinates import EarthLocation
+    from casacore import tables
+    from daskms import xds_from_ms, xds_from_table
+    
+    # Subtable metadata (small, read fully)
+    ant = xds_from_table(f"{in_ms}::ANTENNA")[0]
+    spw = xds_from_table(f"{in_ms}::SPECTRAL_WINDOW")[0]
+    pol = xds_from_table(f"{in_ms}::POLARIZATION")[0]
+    field = xds_from_table(f"{in_ms}::FIELD")[0]
+    obs = xds_from_table(f"{in_ms}::OBSERVATION")[0]
+    
+    if spw.sizes['row'] != 1:
+        raise ValueError("Streaming conversion only supports single-SPW MS files")
+    
+    antenna_names = np.asarray(ant.NAME.values).astype(str)
+    antenna_xyz = ant.POSITION.values
+    freq_array = spw.CHAN_FREQ.values[0]
+    channel_width = spw.CHAN_WIDTH.values[0]
+    polarization_array = np.array([CASA_TO_AIPS_POL[int(c)] for c in pol.CORR_TYPE.values[0]])
+    phase_dir = field.PHASE_DIR.values[0, 0]
+    telescope_name = str(obs.TELESCOPE_NAME.values[0])
+    
+    # Phase center frame from the FIELD table measure reference
+    with tables.table(f"{in_ms}::FIELD", ack=False) as t:
+        dir_ref = t.getcolkeyword("PHASE_DIR", "MEASINFO").get("Ref", "J2000")
+    if dir_ref not in MS_DIR_REF_TO_FRAME:
+        raise ValueError(f"Unsupported PHASE_DIR reference frame: {dir_ref}")
+    phase_frame, phase_epoch = MS_DIR_REF_TO_FRAME[dir_ref]
+    
+    with tables.table(in_ms, ack=False) as t:
+        weight_col = "WEIGHT_SPECTRUM" if "WEIGHT_SPECTRUM" in t.colnames() else "WEIGHT"
+    
+    # Telescope location: array center in ECEF, antennas relative to it
+    telescope_xyz = antenna_xyz.mean(axis=0)
+    location = EarthLocation.from_geocentric(*telescope_xyz, unit=u.m)
+    
+    # Main table, ordered by time then baseline as UVH5 expects
+    columns = ["TIME", "EXPOSURE", "ANTENNA1", "ANTENNA2", "UVW", "DATA", "FLAG", weight_col]
+    ds = xds_from_ms(in_ms, columns=columns, group_cols=["DATA_DESC_ID"],
+                     index_cols=["TIME", "ANTENNA1", "ANTENNA2"],
+                     chunks={'row': chunk_rows})[0]
+    
+    # Per-baseline-time header arrays are 1-D/3-vector and cheap to load
+    time_array = ds.TIME.values / 86400.0 + 2400000.5  # MJD seconds -> JD
+    ant_1_array = ds.ANTENNA1.values
+    ant_2_array = ds.ANTENNA2.values
+    n_blts = time_array.size
+    n_freqs = freq_array.size
+    n_pols = polarization_array.size
+    n_bls = np.unique(ant_1_array * (antenna_names.size + 1) + ant_2_array).size
+    
+    if verbose:
+        print(f"Streaming {n_blts} rows x {n_freqs} channels x {n_pols} pols "
+              f"in chunks of {chunk_rows} rows")
+    
+    with h5py.File(out_uvh5, 'w') as f:
+        hdr = f.create_group("Header")
+        hdr["telescope_frame"] = np.bytes_("itrs")
+        hdr["latitude"] = location.lat.deg
+        hdr["longitude"] = location.lon.deg
+        hdr["altitude"] = location.height.to_value(u.m)
+        hdr["telescope_name"] = np.bytes_(telescope_name)
+        hdr["instrument"] = np.bytes_(telescope_name)
+        hdr["object_name"] = np.bytes_(str(field.NAME.values[0]))
+        hdr["history"] = np.bytes_(f"Converted from {in_ms} by ms_preproc_uvh5 (streaming)")
+        hdr["vis_units"] = np.bytes_("UNCALIB")
+        catalog = hdr.create_group("phase_center_catalog").create_group("0")
+        catalog["cat_name"] = np.bytes_(str(field.NAME.values[0]))
+        catalog["cat_type"] = np.bytes_("sidereal")
+        catalog["cat_lon"] = float(phase_dir[0])
+        catalog["cat_lat"] = float(phase_dir[1])
+        catalog["cat_frame"] = np.bytes_(phase_frame)
+        if phase_epoch is not None:
+            catalog["cat_epoch"] = phase_epoch
+        hdr["phase_center_id_array"] = np.zeros(n_blts, dtype=int)
+        hdr["Nants_telescope"] = antenna_names.size
+        hdr["Nants_data"] = np.union1d(ant_1_array, ant_2_array).size
+        hdr["Nbls"] = n_bls
+        hdr["Nblts"] = n_blts
+        hdr["Ntimes"] = np.unique(time_array).size
+        hdr["Nfreqs"] = n_freqs
+        hdr["Npols"] = n_pols
+        hdr["Nspws"] = 1
+        hdr["spw_array"] = np.array([0])
+        hdr["antenna_names"] = antenna_names.astype("S")
+        hdr["antenna_numbers"] = np.arange(antenna_names.size)
+        hdr["antenna_positions"] = antenna_xyz - telescope_xyz
+        hdr["freq_array"] = freq_array
+        hdr["channel_width"] = channel_width
+        hdr["flex_spw_id_array"] = np.zeros(n_freqs, dtype=int)
+        hdr["polarization_array"] = polarization_array
+        hdr["time_array"] = time_array
+        hdr["integration_time"] = ds.EXPOSURE.values
+        hdr["ant_1_array"] = ant_1_array
+        hdr["ant_2_array"] = ant_2_array
+        
+        # UVH5 uses the opposite baseline conjugation convention from CASA
+        uvw = hdr.create_dataset("uvw_array", (n_blts, 3), dtype=np.float64)
+        
+        dgrp = f.create_group("Data")
+        shape = (n_blts, n_freqs, n_pols)
+        visdata = dgrp.create_dataset("visdata", shape, dtype=np.complex64,
+                                      chunks=(min(chunk_rows, n_blts), n_freqs, n_pols))
+        flags = dgrp.create_dataset("flags", shape, dtype=bool)
+        nsamples = dgrp.create_dataset("nsamples", shape, dtype=np.float32)
+        
+        for start in range(0, n_blts, chunk_rows):
+            stop = min(start + chunk_rows, n_blts)
+            rows = slice(start, stop)
+            uvw[rows] = -ds.UVW.data[rows].compute()
+            visdata[rows] = np.conj(ds.DATA.data[rows].compute())
+            flags[rows] = ds.FLAG.data[rows].compute()
+            weights = ds[weight_col].data[rows].compute()
+            if weights.ndim == 2:
+                weights = np.broadcast_to(weights[:, np.newaxis, :], (stop - start, n_freqs, n_pols))
+            nsamples[rows] = weights
+            if verbose:
+                print(f"  Wrote rows {start}-{stop} of {n_blts}")
+    
+    return out_uvh5
+
+def verify_uvh5(in_ms, out_uvh5, verbose=False):
+    """
+    Compare a UVH5 file with the same MS read by pyuvdata's read_ms.
+    
+    Both objects are put in time-baseline order, then the data, flags,
+    sample counts, uvw, frequencies and phase center are compared.
+    
+    Args:
+        in_ms (str): Input MS file path
+        out_uvh5 (str): UVH5 file written from in_ms
+        verbose (bool): Enable verbose output
+    
+    Returns:
+        list: Names of the mismatched attributes (empty if they all agree)
+    """
+    ref = UVData()
+    ref.read_ms(in_ms)
+    out = UVData()
+    out.read_uvh5(out_uvh5)
+    for uv in (ref, out):
+        uv.reorder_blts(order="time", minor_order="baseline")
+    
+    mismatched = []
+    for name in ("data_array", "flag_array", "nsample_array", "uvw_array",
+                 "freq_array", "time_array", "ant_1_array", "ant_2_array"):
+        a, b = getattr(ref, name), getattr(out, name)
+        if a.shape != b.shape or not np.allclose(a, b, rtol=1e-6, atol=1e-6):
+            mismatched.append(name)
+    
+    ref_pc = next(iter(ref.phase_center_catalog.values()))
+    out_pc = next(iter(out.phase_center_catalog.values()))
+    for key in ("cat_lon", "cat_lat"):
+        if not np.isclose(ref_pc[key], out_pc[key]):
+            mismatched.append(f"phase_center_catalog.{key}")
+    for key in ("cat_frame", "cat_epoch"):
+        if ref_pc.get(key) != out_pc.get(key):
+            mismatched.append(f"phase_center_catalog.{key}")
+    
+    if verbose:
+        print("Round-trip check: " + ("OK" if not mismatched else ", ".join(mismatched)))
+    return mismatched
+
 def main():
     """Main function for command-line tool."""
     args = parse_arguments()
@@ -83,7 +289,16 @@ def main():
         output_uvh5.unlink()
     
     try:
-        ms_to_uvh5(str(input_ms), str(output_uvh5), verbose=args.verbose)
+        if args.stream:
+            ms_to_uvh5_streaming(str(input_ms), str(output_uvh5),
+                                 chunk_rows=args.chunk_rows, verbose=args.verbose)
+        else:
+            ms_to_uvh5(str(input_ms), str(output_uvh5), verbose=args.verbose)
+        
+        if args.verify:
+            mismatched = verify_uvh5(str(input_ms), str(output_uvh5), verbose=args.verbose)
+            if mismatched:
+                raise ValueError(f"Output differs from read_ms in: {', '.join(mismatched)}")
         
     except Exception as e:
         print(f"Error during conversion: {e}")
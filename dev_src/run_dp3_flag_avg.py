@@ -2,36 +2,48 @@
 """
 Minimal script to run DP3 with aoflagger and frequency averaging
 Uses podman to run DP3 with default aoflagger strategy and averages every 3 channels
+(by default; see --freqstep/--timestep)
 """
 
+import argparse
 import subprocess
 import sys
-import os
+import tempfile
 from pathlib import Path
+from linc_container import image_ref, podman_resource_args, run_streaming
 
-def run_dp3_flag_avg(input_ms, output_ms, strategy_file=None):
+def run_dp3_flag_avg(input_ms, output_ms, strategy_file=None, freqstep=3, timestep=1,
+                     dysco=False, numa_node=None, threads=None, memory=None):
     """
-    Run DP3 with aoflagger and frequency averaging
+    Run DP3 with aoflagger and frequency/time averaging
     
     Args:
         input_ms: Path to input measurement set
         output_ms: Path to output measurement set
         strategy_file: Optional custom aoflagger strategy file
+        freqstep: Number of channels to average together
+        timestep: Number of timesteps to average together
+        dysco: Write the output MS with the Dysco compressing storage manager
+        numa_node: NUMA node to pin the container to (optional)
+        threads: Number of CPUs/threads for the container (optional)
+        memory: Container memory limit, e.g. "64g" (optional)
     """
     
     input_path = Path(input_ms)
     output_path = Path(output_ms)
     
-    # Find common parent directory
-    common_parent = Path(os.path.commonpath([input_path.parent, output_path.parent]))
-    
-    # Calculate relative paths from common parent
-    input_rel_path = input_path.relative_to(common_parent)
-    output_rel_path = output_path.relative_to(common_parent)
+    # Mount each MS's own (symlink-resolved) directory: input read-only as
+    # /in, output as /out, so the two may live on different filesystems
+    input_dir = input_path.resolve().parent
+    output_dir = output_path.resolve().parent
     
     # Create container paths
-    input_container_path = f"/data/{input_rel_path}"
-    output_container_path = f"/data/{output_rel_path}"
+    input_container_path = f"/in/{input_path.resolve().name}"
+    output_container_path = f"/out/{output_path.resolve().name}"
+    
+    # Dysco-compressed output; readers of the MS need the Dysco storage manager
+    dysco_settings = ("msout.storagemanager = dysco\n"
+                      "msout.storagemanager.weightbitrate = 12\n") if dysco else ""
     
     # Create DP3 parset for flagging and averaging
     parset_content = f"""
@@ -41,70 +53,83 @@ msin.name = {input_container_path}
 msout.type = ms
 msout.name = {output_container_path}
 msout.writefullresflag = true
-
+{dysco_settings}
 steps = [flag, avg]
 
 # Aoflagger step with default strategy
 flag.type = aoflagger
 flag.strategy = /usr/local/share/linc/rfistrategies/lofar-default.lua
 
-# Frequency averaging step - average every 3 channels
+# Averaging step - done here so every later step reads the smaller MS
 avg.type = averager
-avg.freqstep = 3
+avg.freqstep = {freqstep}
+avg.timestep = {timestep}
 """
 
-    # Write parset to temporary file
-    parset_file = Path("dp3_flag_avg.parset")
-    with open(parset_file, 'w') as f:
-        f.write(parset_content)
-    
     print(f"Running DP3 with aoflagger and frequency averaging...")
     print(f"Input: {input_ms}")
     print(f"Output: {output_ms}")
+    print(f"Averaging: freqstep={freqstep}, timestep={timestep}")
     
-    # Prepare podman command
-    # Mount the common parent directory that contains both input and output
-    
-    podman_cmd = [
-        "podman", "run", "--rm",
-        "-v", f"{common_parent}:/data",
-        "-v", f"{Path(parset_file).parent}:/config",
-        "astronrd/linc:latest",
-        "DP3", f"/config/{parset_file.name}"
-    ]
-    
-    print(f"Command: {' '.join(podman_cmd)}")
-    
-    try:
-        # Run DP3
-        result = subprocess.run(podman_cmd, check=True, capture_output=True, text=True)
-        print("DP3 completed successfully!")
-        print("STDOUT:", result.stdout)
+    # Write parset into a private temporary directory, mounted read-only as
+    # /config; concurrent runs never share a parset and nothing lands in CWD
+    with tempfile.TemporaryDirectory(prefix="dp3_flag_avg_") as config_dir:
+        parset_file = Path(config_dir) / "dp3_flag_avg.parset"
+        parset_file.write_text(parset_content)
         
-        # Clean up parset file
-        parset_file.unlink()
+        # Prepare podman command
+        podman_cmd = [
+            "podman", "run", "--rm", "--pull=never",
+            *podman_resource_args(numa_node, threads, memory),
+            "-v", f"{input_dir}:/in:ro",
+            "-v", f"{output_dir}:/out",
+            "-v", f"{config_dir}:/config:ro",
+            image_ref(),
+            "DP3", f"/config/{parset_file.name}"
+        ]
         
-    except subprocess.CalledProcessError as e:
-        print(f"DP3 failed with exit code {e.returncode}")
-        print("STDERR:", e.stderr)
-        sys.exit(1)
+        print(f"Command: {' '.join(podman_cmd)}")
+        
+        try:
+            # Run DP3, streaming its progress output
+            run_streaming(podman_cmd)
+            print("DP3 completed successfully!")
+            
+        except subprocess.CalledProcessError as e:
+            print(f"DP3 failed with exit code {e.returncode}")
+            print("Last DP3 output:")
+            print(e.output)
+            sys.exit(1)
 
 def main():
     """Main function"""
-    if len(sys.argv) < 3:
-        print("Usage: python3 run_dp3_flag_avg.py <input_ms> <output_ms>")
-        print("Example: python3 run_dp3_flag_avg.py /path/to/input.ms /path/to/output.ms")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Run DP3 with aoflagger and frequency averaging using podman",
+        epilog="Example: python3 run_dp3_flag_avg.py /path/to/input.ms /path/to/output.ms")
+    parser.add_argument("input_ms", help="Path to input measurement set")
+    parser.add_argument("output_ms", help="Path to output measurement set")
+    parser.add_argument("--freqstep", type=int, default=3,
+                        help="Number of channels to average (default: 3)")
+    parser.add_argument("--timestep", type=int, default=1,
+                        help="Number of timesteps to average (default: 1)")
+    parser.add_argument("--dysco", action="store_true",
+                        help="Write the output MS with Dysco compression")
+    parser.add_argument("--numa-node", type=int,
+                        help="Pin the container to the CPUs and memory of this NUMA node")
+    parser.add_argument("--threads", type=int,
+                        help="CPU quota and OMP/OpenBLAS thread count for the container")
+    parser.add_argument("--memory", help="Container memory limit (e.g. 64g)")
     
-    input_ms = sys.argv[1]
-    output_ms = sys.argv[2]
+    args = parser.parse_args()
     
     # Check if input MS exists
-    if not Path(input_ms).exists():
-        print(f"Error: Input measurement set not found: {input_ms}")
+    if not Path(args.input_ms).exists():
+        print(f"Error: Input measurement set not found: {args.input_ms}")
         sys.exit(1)
     
-    run_dp3_flag_avg(input_ms, output_ms)
+    run_dp3_flag_avg(args.input_ms, args.output_ms, freqstep=args.freqstep,
+                     timestep=args.timestep, dysco=args.dysco, numa_node=args.numa_node,
+                     threads=args.threads, memory=args.memory)
 
 if __name__ == "__main__":
     main()
@@ -1,23 +1,34 @@
 #!/usr/bin/env python3
 """
 Minimal script to run gain calibration using DP3
-Assumes MODEL_DATA column has been filled by wsclean imaging
+Assumes MODEL_DATA column has been filled by wsclean imaging, or predicts
+the model from a WSClean source list with --model-prefix
 """
 
+import argparse
 import subprocess
 import sys
-import os
+import tempfile
 from pathlib import Path
+from linc_container import image_ref, podman_resource_args, run_streaming
 
-def run_gaincal(input_ms, output_ms=None, solint=0, caltype="gain"):
+def run_gaincal(input_ms, output_ms=None, solint=0, caltype="gain", model_prefix=None,
+                numa_node=None, threads=None, memory=None):
     """
     Run DP3 gain calibration
     
     Args:
-        input_ms: Path to input measurement set (with MODEL_DATA)
+        input_ms: Path to input measurement set (with MODEL_DATA unless model_prefix is given)
         output_ms: Path to output measurement set (optional, defaults to input_ms_cal.ms)
         solint: Solution interval in timesteps (0 = per scan)
         caltype: Calibration type (gain, phase, bandpass)
+        model_prefix: Predict the model from the WSClean component list
+                      <model_prefix>-sources.txt next to the input MS inside
+                      the gaincal step, instead of reading MODEL_DATA
+                      (optional; skips a separate predict run)
+        numa_node: NUMA node to pin the container to (optional)
+        threads: Number of CPUs/threads for the container (optional)
+        memory: Container memory limit, e.g. "64g" (optional)
     """
     
     input_path = Path(input_ms)
@@ -37,8 +48,20 @@ def run_gaincal(input_ms, output_ms=None, solint=0, caltype="gain"):
     print(f"Output: {output_ms}")
     print(f"Solution interval: {solint} (0=per scan)")
     print(f"Calibration type: {caltype}")
-
-
+    
+    # Model source: on-the-fly predict from a component list, or MODEL_DATA
+    if model_prefix is not None:
+        sourcedb = input_path.parent / f"{model_prefix}-sources.txt"
+        if not sourcedb.exists():
+            print(f"Error: Source list not found: {sourcedb}")
+            print("Image with -save-source-list to create it")
+            sys.exit(1)
+        print(f"Model: {sourcedb} (predicted in DP3)")
+        model_settings = f"""gaincal.usemodelcolumn = false
+gaincal.sourcedb = /data/{sourcedb.name}"""
+    else:
+        model_settings = """gaincal.usemodelcolumn = true
+gaincal.modelcolumn = MODEL_DATA"""
 
     # Create DP3 parset for gain calibration
     parset_content = f"""msin = /data/{input_path.name}
@@ -52,8 +75,7 @@ gaincal.caltype = diagonalphase
 gaincal.uvlambdamin = 10
 gaincal.maxiter = 100
 gaincal.tolerance = 1e-4
-gaincal.usemodelcolumn = true
-gaincal.modelcolumn = MODEL_DATA
+{model_settings}
 gaincal.parmdb = /data/solution.h5
 
 """
@@ -62,72 +84,69 @@ gaincal.parmdb = /data/solution.h5
 #applycal.correction = phase
 
 
-    # Write parset to temporary file
-    parset_file = Path("gaincal.parset")
-    with open(parset_file, 'w') as f:
-        f.write(parset_content)
-    
     # Prepare podman command
     input_dir = input_path.parent
     
-    podman_cmd = [
-        "podman", "run", "--rm",
-        "-v", f"{input_dir}:/data",
-        "-v", f"{Path.cwd()}:/config",
-        "-w", "/config",
-        "astronrd/linc:latest",
-        "DP3", f"/config/{parset_file.name}"
-    ]
-    
     print(f"Running DP3 gain calibration...")
     
-    try:
-        # Run DP3
-        result = subprocess.run(podman_cmd, check=True, capture_output=True, text=True)
-        print("DP3 gain calibration completed successfully!")
-        if result.stdout:
-            print("STDOUT:", result.stdout)
-        
-        # Check if output MS was created
-        if output_ms.exists():
-            print(f"Calibrated MS created: {output_ms}")
-        else:
-            print("Warning: Output MS not found")
+    # Write parset into a private temporary directory, mounted read-only as
+    # /config; concurrent runs never share a parset and nothing lands in CWD
+    with tempfile.TemporaryDirectory(prefix="gaincal_") as config_dir:
+        parset_file = Path(config_dir) / "gaincal.parset"
+        parset_file.write_text(parset_content)
         
-        # Clean up parset file
-        parset_file.unlink()
+        podman_cmd = [
+            "podman", "run", "--rm", "--pull=never",
+            *podman_resource_args(numa_node, threads, memory),
+            "-v", f"{input_dir}:/data",
+            "-v", f"{config_dir}:/config:ro",
+            "-w", "/data",
+            image_ref(),
+            "DP3", f"/config/{parset_file.name}"
+        ]
         
-    except subprocess.CalledProcessError as e:
-        print(f"DP3 gain calibration failed with exit code {e.returncode}")
-        if e.stdout:
-            print("STDOUT:", e.stdout)
-        if e.stderr:
-            print("STDERR:", e.stderr)
-        # Clean up parset file even on failure
-        if parset_file.exists():
-            parset_file.unlink()
-        sys.exit(1)
+        try:
+            # Run DP3, streaming its progress output
+            run_streaming(podman_cmd)
+            print("DP3 gain calibration completed successfully!")
+            
+            # Check if output MS was created
+            if output_ms.exists():
+                print(f"Calibrated MS created: {output_ms}")
+            else:
+                print("Warning: Output MS not found")
+            
+        except subprocess.CalledProcessError as e:
+            print(f"DP3 gain calibration failed with exit code {e.returncode}")
+            if e.output:
+                print("Last DP3 output:")
+                print(e.output)
+            sys.exit(1)
 
 def main():
     """Main function"""
-    if len(sys.argv) < 2:
-        print("Usage: python3 run_gaincal.py <input_ms> [output_ms] [solint] [caltype]")
-        print("Examples:")
-        print("  python3 run_gaincal.py /path/to/data.ms")
-        print("  python3 run_gaincal.py /path/to/data.ms /path/to/calibrated.ms")
-        print("  python3 run_gaincal.py /path/to/data.ms calibrated.ms 0 gain")
-        print("")
-        print("Parameters:")
-        print("  solint: Solution interval (0=per scan, 1=per timestep)")
-        print("  caltype: gain, phase, or bandpass")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Run DP3 gain calibration using podman",
+        epilog="Example: python3 run_gaincal.py /path/to/data.ms calibrated.ms 0 gain")
+    parser.add_argument("input_ms", help="Path to input measurement set (with MODEL_DATA)")
+    parser.add_argument("output_ms", nargs="?", help="Path to output measurement set")
+    parser.add_argument("solint", nargs="?", type=int, default=0,
+                        help="Solution interval (0=per scan, 1=per timestep)")
+    parser.add_argument("caltype", nargs="?", default="gain",
+                        help="gain, phase, or bandpass")
+    parser.add_argument("--model-prefix",
+                        help="Predict the model from <prefix>-sources.txt inside DP3 "
+                             "instead of reading MODEL_DATA")
+    parser.add_argument("--numa-node", type=int,
+                        help="Pin the container to the CPUs and memory of this NUMA node")
+    parser.add_argument("--threads", type=int,
+                        help="CPU quota and OMP/OpenBLAS thread count for the container")
+    parser.add_argument("--memory", help="Container memory limit (e.g. 64g)")
     
-    input_ms = sys.argv[1]
-    output_ms = sys.argv[2] if len(sys.argv) > 2 else None
-    solint = int(sys.argv[3]) if len(sys.argv) > 3 else 0
-    caltype = sys.argv[4] if len(sys.argv) > 4 else "gain"
+    args = parser.parse_args()
     
-    run_gaincal(input_ms, output_ms, solint, caltype)
+    run_gaincal(args.input_ms, args.output_ms, args.solint, args.caltype,
+                model_prefix=args.model_prefix, numa_node=args.numa_node, threads=args.threads, memory=args.memory)
 
 if __name__ == "__main__":
     main()
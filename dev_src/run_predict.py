@@ -4,12 +4,27 @@ Minimal script to run wsclean in predict mode to fill MODEL_DATA column
 Uses an existing CLEAN model from previous imaging
 """
 
+import argparse
 import subprocess
 import sys
 import os
+import re
 from pathlib import Path
+from linc_container import available_cpus, image_ref, podman_resource_args
 
-def run_predict(input_ms, model_prefix, output_ms=None):
+def _model_channels(model_dir, model_prefix):
+    """
+    Count the per-channel model images <prefix>-NNNN-model.fits
+    
+    wsclean -predict must be run with the -channels-out the model was imaged
+    with; returns 0 if there are only single-channel models.
+    """
+    channel_re = re.compile(re.escape(model_prefix) + r"-\d{4}-model\.fits$")
+    with os.scandir(model_dir) as entries:
+        return sum(1 for e in entries if channel_re.match(e.name))
+
+def run_predict(input_ms, model_prefix, output_ms=None, numa_node=None, threads=None,
+                memory=None):
     """
     Run wsclean in predict mode to fill MODEL_DATA column
     
@@ -17,6 +32,10 @@ def run_predict(input_ms, model_prefix, output_ms=None):
         input_ms: Path to input measurement set
         model_prefix: Prefix of model files (e.g., "image" for image-model.fits)
         output_ms: Path to output MS (optional, defaults to input_ms_model.ms)
+        numa_node: NUMA node to pin the container to (optional)
+        threads: Number of CPUs/threads for the container and wsclean
+                 (optional, defaults to the CPUs of numa_node, or of this process)
+        memory: Container memory limit, e.g. "64g" (optional)
     """
     
     input_path = Path(input_ms)
@@ -25,9 +44,14 @@ def run_predict(input_ms, model_prefix, output_ms=None):
         print(f"Error: Input measurement set not found: {input_ms}")
         sys.exit(1)
     
-    # Check for model file
+    # Check for model file(s); multi-channel models predict per channel
     model_dir = input_path.parent
-    model_file = model_dir / f"{model_prefix}-model.fits"
+    channels_out = _model_channels(model_dir, model_prefix)
+    if channels_out:
+        model_file = model_dir / f"{model_prefix}-0000-model.fits"
+    else:
+        channels_out = 1
+        model_file = model_dir / f"{model_prefix}-model.fits"
     
     if not model_file.exists():
         print(f"Error: Model file not found: {model_file}")
@@ -44,13 +68,22 @@ def run_predict(input_ms, model_prefix, output_ms=None):
     print(f"Input: {input_ms}")
     print(f"Model: {model_file}")
     print(f"Output: {output_ms}")
+    print(f"Channels out: {channels_out}")
+    
+    # wsclean predict scales with cores up to memory bandwidth; without an
+    # explicit count use only the CPUs the container is pinned to
+    nthreads = threads if threads is not None else available_cpus(numa_node)
     
     # Build wsclean predict command
     wsclean_cmd = [
         "wsclean",
         "-predict",                    # Predict mode - fills MODEL_DATA
         "-name", model_prefix,         # Use existing model
-        "-channels-out", "1",          # Single channel output
+        "-channels-out", str(channels_out),  # Match the model's channels
+        "-j", str(nthreads),
+        "-parallel-gridding", str(nthreads),
+        "-parallel-reordering", str(nthreads),
+        "-mem", "80",                  # Cap RAM use at 80% of the machine
         str(input_path)
     ]
     
@@ -58,10 +91,11 @@ def run_predict(input_ms, model_prefix, output_ms=None):
     input_dir = input_path.parent
     
     podman_cmd = [
-        "podman", "run", "--rm",
+        "podman", "run", "--rm", "--pull=never",
+        *podman_resource_args(numa_node, threads, memory),
         "-v", f"{input_dir}:/data",
         "-w", "/data",
-        "astronrd/linc:latest"
+        image_ref()
     ] + wsclean_cmd
     
     # Update paths for container
@@ -86,21 +120,23 @@ def run_predict(input_ms, model_prefix, output_ms=None):
 
 def main():
     """Main function"""
-    if len(sys.argv) < 3:
-        print("Usage: python3 run_predict.py <input_ms> <model_prefix> [output_ms]")
-        print("Examples:")
-        print("  python3 run_predict.py /path/to/data.ms image")
-        print("  python3 run_predict.py /path/to/data.ms test_model /path/to/output.ms")
-        print("")
-        print("Note: This requires existing model files (model_prefix-model.fits)")
-        print("      from previous wsclean imaging run")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Run wsclean predict to fill MODEL_DATA using podman",
+        epilog="Note: This requires existing model files (model_prefix-model.fits) "
+               "from previous wsclean imaging run")
+    parser.add_argument("input_ms", help="Path to input measurement set")
+    parser.add_argument("model_prefix", help="Prefix of model files (e.g. image)")
+    parser.add_argument("output_ms", nargs="?", help="Path to output measurement set")
+    parser.add_argument("--numa-node", type=int,
+                        help="Pin the container to the CPUs and memory of this NUMA node")
+    parser.add_argument("--threads", type=int,
+                        help="CPU quota and OMP/OpenBLAS thread count for the container")
+    parser.add_argument("--memory", help="Container memory limit (e.g. 64g)")
     
-    input_ms = sys.argv[1]
-    model_prefix = sys.argv[2]
-    output_ms = sys.argv[3] if len(sys.argv) > 3 else None
+    args = parser.parse_args()
     
-    run_predict(input_ms, model_prefix, output_ms)
+    run_predict(args.input_ms, args.model_prefix, args.output_ms,
+                numa_node=args.numa_node, threads=args.threads, memory=args.memory)
 
 if __name__ == "__main__":
     main()
@@ -4,8 +4,10 @@ Self-calibration Pipeline using DP3 and wsclean via astronrd/linc container
 Processes ./testdata/slow/20240519_173002_55MHz.ms for self-calibration
 """
 
+import copy
 import os
 import sys
+import shutil
 import subprocess
 import time
 import json
@@ -13,35 +15,89 @@ import yaml
 from pathlib import Path
 import argparse
 import logging
+import multiprocessing
+import threading
+from collections import deque
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+@lru_cache(maxsize=8)
+def _load_config(config_path, mtime_ns):
+    """Parse a YAML configuration file, cached per (path, mtime)"""
+    try:
+        with open(config_path, 'r') as f:
+            return yaml.safe_load(f)
+    except yaml.YAMLError as e:
+        raise ValueError(f"Error parsing YAML configuration file: {e}")
+
+
+# Local pull-through cache of Docker Hub (see start_cache.sh), used when
+# USE_LOCAL_CACHE=1
+LOCAL_CACHE_REGISTRY = "localhost:5051"
 
 
 class SelfCalPipeline:
     """Self-calibration pipeline using DP3 and wsclean via astronrd/linc container"""
     
-    def __init__(self, ms_path, output_dir="./selfcal_output", log_level="INFO", config_file="selfcal_config.yml"):
+    # Container images already verified present in this process; later
+    # pipeline runs skip the podman and image checks entirely
+    _images_checked = set()
+    
+    def __init__(self, ms_path, output_dir="./selfcal_output", log_level="INFO", config_file="selfcal_config.yml",
+                 cpuset=None, memory=None, n_jobs=1):
         self.ms_path = Path(ms_path)
         self.output_dir = Path(output_dir)
         self.log_level = log_level
         self.config_file = config_file
         
+        # Container resource limits: podman --cpuset-cpus / --memory values
+        self.cpuset = cpuset
+        self.memory = memory
+        
         # Load configuration from YAML file
         self.config = self.load_config()
         
-        # Setup logging
-        self.setup_logging()
+        # Concurrent wsclean runs share the machine's memory
+        if n_jobs > 1:
+            img_params = self.config['imaging_params']
+            img_params['mem_percentage'] = max(1, int(img_params['mem_percentage']) // n_jobs)
         
         # Validate input
         if not self.ms_path.exists():
             raise FileNotFoundError(f"Measurement set not found: {self.ms_path}")
         
-        # Create output directory
+        # Create output directory (before logging, which writes into it)
         self.output_dir.mkdir(parents=True, exist_ok=True)
         
+        # Setup logging
+        self.setup_logging()
+        
         # Extract configuration parameters
         self.linc_image = self.config['container_images']['linc']
+        # Pull through the local registry cache started by start_cache.sh
+        self._use_local_cache = os.environ.get("USE_LOCAL_CACHE") == "1"
+        if self._use_local_cache:
+            self.linc_image = f"{LOCAL_CACHE_REGISTRY}/{self.linc_image}"
         self.selfcal_iterations = self.config['selfcal_params']['iterations']
         self.smoothness_constraint = self.config['selfcal_params']['smoothness_constraint']
         self.solver_type = self.config['selfcal_params']['solver_type']
+        
+        # Long-lived container that DP3/wsclean commands are exec'ed in
+        self.container_id = None
+        
+        # Results of _probe_podman(); None until the probe has run
+        self._podman_ok = None
+        self._image_ok = None
+        self._linc_digest = None
+        
+        # wsclean scratch (reordered visibilities) kept in RAM when possible;
+        # mounted at the same path inside the container
+        shm = Path("/dev/shm")
+        self.temp_dir = shm / f"wsclean_{os.getpid()}" if shm.is_dir() else None
+        
+        # wsclean arguments shared by all imaging runs
+        self._wsclean_template = self._build_wsclean_template()
     
     def load_config(self):
         """Load configuration from YAML file"""
@@ -49,83 +105,258 @@ class SelfCalPipeline:
         if not config_path.exists():
             raise FileNotFoundError(f"Configuration file not found: {config_path}")
         
-        try:
-            with open(config_path, 'r') as f:
-                config = yaml.safe_load(f)
-            return config
-        except yaml.YAMLError as e:
-            raise ValueError(f"Error parsing YAML configuration file: {e}")
+        # Parsed once per file version; each instance gets its own copy
+        # since the pipeline may adjust settings (e.g. memory per job)
+        config = _load_config(str(config_path.resolve()), config_path.stat().st_mtime_ns)
+        return copy.deepcopy(config)
         
     def setup_logging(self):
-        """Setup logging configuration"""
-        logging.basicConfig(
-            level=getattr(logging, self.log_level.upper()),
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(self.output_dir / 'selfcal_pipeline.log'),
-                logging.StreamHandler(sys.stdout)
-            ]
-        )
-        self.logger = logging.getLogger(__name__)
+        """
+        Setup logging configuration
         
-    def run_linc_command(self, cmd, volumes=None, workdir=None):
-        """Run a command in the astronrd/linc container"""
-        podman_cmd = ["podman", "run", "--rm"]
+        Each pipeline gets its own logger and handlers (not basicConfig on
+        the root logger), so a reused pool worker logs every MS to that
+        MS's own selfcal_pipeline.log. close_logging releases them.
+        """
+        self.logger = logging.getLogger(f"{__name__}.{self.output_dir.resolve()}")
+        self.logger.setLevel(getattr(logging, self.log_level.upper()))
+        self.logger.propagate = False
+        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+        for handler in (logging.FileHandler(self.output_dir / 'selfcal_pipeline.log'),
+                        logging.StreamHandler(sys.stdout)):
+            handler.setFormatter(formatter)
+            self.logger.addHandler(handler)
+    
+    def close_logging(self):
+        """Remove and close this pipeline's log handlers"""
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+            handler.close()
         
-        # Add volume mounts
-        if volumes:
-            for host_path, container_path in volumes.items():
-                podman_cmd.extend(["-v", f"{host_path}:{container_path}"])
+    def _start_container(self):
+        """
+        Start one detached LINC container for the whole pipeline run
         
-        # Add working directory
-        if workdir:
-            podman_cmd.extend(["-w", workdir])
+        The MS directory and output directory are mounted at /data and
+        /output, as run_linc_command callers expect, plus the wsclean scratch
+        directory. Subsequent commands are run with podman exec, avoiding a
+        container start per DP3/wsclean step.
+        """
+        podman_cmd = [
+            "podman", "run", "-d", "--rm",
+            "-v", f"{self.ms_path.parent.resolve()}:/data",
+            "-v", f"{self.output_dir.resolve()}:/output",
+        ]
+        podman_cmd.extend(self._resource_args(self.cpuset, self.memory))
+        if self.temp_dir is not None:
+            self.temp_dir.mkdir(parents=True, exist_ok=True)
+            podman_cmd.extend(["-v", f"{self.temp_dir}:{self.temp_dir}"])
+        podman_cmd += [
+            "--entrypoint", "sleep",
+            self.linc_image, "infinity"
+        ]
+        result = subprocess.run(podman_cmd, capture_output=True, text=True, check=True)
+        self.container_id = result.stdout.strip()
+        self.logger.info(f"Started LINC container {self.container_id[:12]}")
+    
+    def stop_container(self):
+        """Stop the long-lived container, if one is running, and remove wsclean scratch files"""
+        if self.temp_dir is not None:
+            shutil.rmtree(self.temp_dir, ignore_errors=True)
+        if self.container_id is None:
+            return
+        subprocess.run(["podman", "stop", "-t", "0", self.container_id],
+                       capture_output=True, text=True)
+        self.logger.info(f"Stopped LINC container {self.container_id[:12]}")
+        self.container_id = None
+    
+    @staticmethod
+    def _resource_args(cpuset=None, memory=None):
+        """podman run options pinning the container to CPUs and capping its memory"""
+        args = []
+        if cpuset is not None:
+            args.append(f"--cpuset-cpus={cpuset}")
+        if memory is not None:
+            args.append(f"--memory={memory}")
+        return args
+    
+    def run_linc_command(self, cmd, volumes=None, workdir=None, cpuset=None, memory=None):
+        """
+        Run a command in the astronrd/linc container
         
-        # Add container image and command
-        podman_cmd.extend([self.linc_image] + cmd)
+        Uses podman exec in the long-lived container when it is running (its
+        mounts already cover /data and /output), otherwise a one-off podman run
+        limited to cpuset/memory (defaulting to the pipeline's limits).
+        Output is streamed to the log line by line (stdout as info, stderr as
+        warning) rather than buffered.
+        """
+        if self.container_id is not None:
+            podman_cmd = ["podman", "exec"]
+            if workdir:
+                podman_cmd.extend(["-w", workdir])
+            podman_cmd.extend([self.container_id] + cmd)
+        else:
+            podman_cmd = ["podman", "run", "--rm"]
+            podman_cmd.extend(self._resource_args(cpuset or self.cpuset, memory or self.memory))
+            
+            # Add volume mounts
+            if volumes:
+                for host_path, container_path in volumes.items():
+                    podman_cmd.extend(["-v", f"{host_path}:{container_path}"])
+            
+            # Add working directory
+            if workdir:
+                podman_cmd.extend(["-w", workdir])
+            
+            # Add container image and command
+            podman_cmd.extend([self.linc_image] + cmd)
         
         self.logger.info(f"Running: {' '.join(podman_cmd)}")
         
         try:
-            result = subprocess.run(
-                podman_cmd,
-                capture_output=True,
-                text=True,
-                check=True
-            )
+            with subprocess.Popen(podman_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                  text=True, bufsize=1) as proc:
+                # Forward both pipes to the log as lines arrive; keep only
+                # the last stderr lines for the failure report
+                stderr_tail = deque(maxlen=50)
+                stderr_thread = threading.Thread(
+                    target=self._forward_lines,
+                    args=(proc.stderr, self.logger.warning, stderr_tail),
+                    daemon=True
+                )
+                stderr_thread.start()
+                self._forward_lines(proc.stdout, self.logger.info)
+                stderr_thread.join()
+            
+            if proc.returncode != 0:
+                raise subprocess.CalledProcessError(proc.returncode, podman_cmd,
+                                                    stderr="".join(stderr_tail))
             self.logger.info("Command completed successfully")
-            if result.stdout:
-                self.logger.debug(f"STDOUT: {result.stdout}")
-            return result
+            return subprocess.CompletedProcess(podman_cmd, proc.returncode)
         except subprocess.CalledProcessError as e:
             self.logger.error(f"Command failed with exit code {e.returncode}")
-            self.logger.error(f"STDERR: {e.stderr}")
+            self.logger.error(f"STDERR (last lines): {e.stderr}")
             raise
     
-    def check_podman(self):
-        """Check if podman is available"""
+    @staticmethod
+    def _forward_lines(pipe, log, tail=None):
+        """Log each line read from pipe, optionally remembering the latest ones in tail"""
+        for line in pipe:
+            log(line.rstrip())
+            if tail is not None:
+                tail.append(line)
+    
+    def _probe_podman(self):
+        """
+        Check podman and the LINC image with as few podman invocations as possible
+        
+        One `podman info` gives the version and storage driver; one
+        `podman image inspect` tells whether the image is present and its
+        digest. Sets self._podman_ok, self._image_ok and self._linc_digest.
+        """
+        if self._podman_ok is not None:
+            return
+        
         try:
-            result = subprocess.run(["podman", "--version"], 
+            result = subprocess.run(["podman", "info", "--format", "json"],
                                   capture_output=True, text=True, check=True)
-            self.logger.info(f"Podman version: {result.stdout.strip()}")
+            info = json.loads(result.stdout)
+            version = info.get('version', {}).get('Version', 'unknown')
+            driver = info.get('store', {}).get('graphDriverName', 'unknown')
+            self.logger.info(f"Podman version: {version} (storage driver: {driver})")
+            self._podman_ok = True
+        except (subprocess.CalledProcessError, FileNotFoundError, ValueError):
+            self._podman_ok = False
+            self._image_ok = False
+            return
+        
+        self._inspect_image()
+    
+    def _inspect_image(self):
+        """Record whether the LINC image is in local storage, and its digest"""
+        result = subprocess.run(
+            ["podman", "image", "inspect", "--format", "{{.Digest}}", self.linc_image],
+            capture_output=True, text=True
+        )
+        self._image_ok = result.returncode == 0
+        self._linc_digest = (result.stdout.strip() or None) if self._image_ok else None
+    
+    def check_podman(self):
+        """Check if podman is available"""
+        if SelfCalPipeline._images_checked:
+            # podman already ran successfully for an earlier image check
             return True
-        except (subprocess.CalledProcessError, FileNotFoundError):
+        self._probe_podman()
+        if not self._podman_ok:
             self.logger.error("Podman not found. Please install podman first.")
-            return False
+        return self._podman_ok
     
     def pull_linc_image(self):
-        """Pull the astronrd/linc container image"""
-        self.logger.info("Pulling astronrd/linc container image...")
-        
-        try:
-            subprocess.run(["podman", "pull", self.linc_image], check=True)
-            self.logger.info("LINC image pulled successfully")
-        except subprocess.CalledProcessError as e:
-            self.logger.error(f"Failed to pull LINC image: {e}")
-            raise
+        """Pull the astronrd/linc container image, unless it is already present locally"""
+        if self.linc_image in SelfCalPipeline._images_checked:
+            return
+        
+        # Image presence comes from the startup probe: no registry round-trip
+        self._probe_podman()
+        if self._image_ok:
+            self.logger.info(f"LINC image {self.linc_image} found locally, skipping pull")
+        else:
+            self.logger.info("Pulling astronrd/linc container image...")
+            
+            # skopeo copies straight into podman's storage, skipping the
+            # extra copy of a podman pull; fall back to podman if it fails
+            if shutil.which("skopeo") and self._skopeo_pull():
+                self.logger.info("LINC image copied with skopeo")
+            else:
+                try:
+                    subprocess.run(["podman", "pull", *self._tls_args("--tls-verify"),
+                                    self.linc_image], check=True)
+                    self.logger.info("LINC image pulled successfully")
+                except subprocess.CalledProcessError as e:
+                    self.logger.error(f"Failed to pull LINC image: {e}")
+                    raise
+            # New image, new digest
+            self._inspect_image()
+        
+        SelfCalPipeline._images_checked.add(self.linc_image)
+    
+    def _image_digest(self):
+        """Return the local digest of the LINC image, or None if it cannot be inspected"""
+        if self._podman_ok is None:
+            self._probe_podman()
+        return self._linc_digest
+    
+    def _tls_args(self, flag):
+        """TLS option for pulls: the local registry cache serves plain HTTP"""
+        return [f"{flag}=false"] if self._use_local_cache else []
+    
+    def _skopeo_pull(self):
+        """Copy the LINC image from its registry into local containers-storage with skopeo"""
+        # Short names (e.g. astronrd/linc:latest) resolve to Docker Hub, like podman's default
+        result = subprocess.run(
+            ["skopeo", "copy", *self._tls_args("--src-tls-verify"),
+             f"docker://{self.linc_image}",
+             f"containers-storage:{self.linc_image}"],
+            capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            self.logger.warning(f"skopeo copy failed, falling back to podman pull: {result.stderr.strip()}")
+            return False
+        return True
     
     def test_linc_tools(self):
-        """Test if DP3 and wsclean are available in the container"""
+        """
+        Test if DP3 and wsclean are available in the container
+        
+        A successful test is recorded in <output_dir>/.linc_tools_ok together
+        with the image digest; later runs skip the test until the image changes.
+        """
+        sentinel = self.output_dir / ".linc_tools_ok"
+        digest = self._image_digest()
+        if digest and sentinel.exists() and sentinel.read_text().strip() == digest:
+            self.logger.info("LINC tools already verified for this image, skipping test")
+            return True
+        
         self.logger.info("Testing LINC container tools...")
         
         try:
@@ -140,25 +371,26 @@ class SelfCalPipeline:
             self.logger.info("Wsclean test successful")
             
             self.logger.info("All LINC tools are working correctly")
+            if digest:
+                sentinel.write_text(digest + "\n")
             return True
             
         except Exception as e:
             self.logger.error(f"LINC tools test failed: {e}")
             return False
     
-    def run_wsclean_imaging(self, image_name, input_ms, iteration=None):
-        """Run wsclean imaging step"""
-        if iteration is None:
-            self.logger.info("Creating initial image...")
-        else:
-            self.logger.info(f"Running wsclean imaging iteration {iteration}...")
+    def _build_wsclean_template(self):
+        """
+        Build the wsclean arguments shared by every imaging run
         
+        Called once from __init__, so the imaging config is validated up
+        front and every iteration images with identical settings.
+        """
         # wsclean parameters for imaging from config
         # mgain < 1 enables major iterations and fills MODEL_DATA column
         img_params = self.config['imaging_params']
         wsclean_cmd = [
             "wsclean",
-            "-name", image_name,
             "-size", str(img_params['image_size'][0]), str(img_params['image_size'][1]),
             "-scale", img_params['pixel_scale'],
             "-weight", img_params['weighting'], str(img_params['briggs_robust']),
@@ -167,13 +399,57 @@ class SelfCalPipeline:
             "-auto-threshold", str(img_params['auto_threshold']).lower(),
             "-auto-mask", str(img_params['auto_mask']).lower(),
             "-mem", str(img_params['mem_percentage']),
-            str(input_ms)
         ]
         
+        # DP3 predicts the model from the component list, so wsclean does
+        # not need to write MODEL_DATA
+        if not self.config['dp3_params']['use_model_column']:
+            wsclean_cmd.extend(["-save-source-list", "-no-update-model-required"])
+        
+        # Reorder into RAM-backed scratch rather than next to the MS
+        if self.temp_dir is not None:
+            wsclean_cmd.extend(["-reorder", "-temp-dir", str(self.temp_dir)])
+        
+        # Grid w-layers in parallel; switch to the w-gridder for large images
+        if img_params.get('parallel_gridding'):
+            wsclean_cmd.extend(["-parallel-gridding", str(img_params['parallel_gridding'])])
+        if max(img_params['image_size']) >= 5000:
+            wsclean_cmd.append("-use-wgridder")
+        
+        # Parallel deconvolution is off unless a sub-image size is configured,
+        # since it can leave artifacts at sub-image edges
+        parallel_deconv = img_params.get('parallel_deconv', False)
+        if parallel_deconv:
+            self.logger.warning("Parallel deconvolution enabled; check for sub-image edge artifacts")
+            wsclean_cmd.extend(["-parallel-deconvolution", str(int(parallel_deconv))])
+        
+        return tuple(wsclean_cmd)
+    
+    def run_wsclean_imaging(self, image_name, input_ms, iteration=None):
+        """Run wsclean imaging step"""
+        if iteration is None:
+            self.logger.info("Creating initial image...")
+        else:
+            self.logger.info(f"Running wsclean imaging iteration {iteration}...")
+        
         volumes = {
             str(self.ms_path.parent): "/data",
             str(self.output_dir): "/output"
         }
+        if self.temp_dir is not None:
+            self.temp_dir.mkdir(parents=True, exist_ok=True)
+            volumes[str(self.temp_dir)] = str(self.temp_dir)
+        
+        # Fixed arguments come from the template; only name and data vary
+        wsclean_cmd = list(self._wsclean_template)
+        wsclean_cmd.extend(["-name", image_name])
+        
+        # After calibration, image the corrected data written in place
+        if iteration is not None:
+            wsclean_cmd.extend(["-data-column", "CORRECTED_DATA"])
+        
+        # MS path as seen inside the container
+        wsclean_cmd.append(f"/data/{Path(input_ms).name}")
         
         self.run_linc_command(
             wsclean_cmd,
@@ -186,23 +462,40 @@ class SelfCalPipeline:
         else:
             self.logger.info(f"Wsclean imaging iteration {iteration} completed")
     
-    def run_dp3_calibration(self, iteration, input_ms, output_ms):
-        """Run DP3 calibration step"""
+    def run_dp3_calibration(self, iteration, ms, model_name):
+        """
+        Run DP3 calibration step, updating the MS in place
+        
+        Solves DATA against the model, stores the solutions in
+        <output_dir>/cal_iter_<iteration>.h5 and writes the corrected data to
+        CORRECTED_DATA of the same MS, so no per-iteration MS copy is made.
+        The model is either the MODEL_DATA column or, by default, predicted
+        inside gaincal from the component list <model_name>-sources.txt.
+        """
         self.logger.info(f"Running DP3 calibration iteration {iteration}...")
         
         # DP3 calibration parset from config
-        # Uses MODEL_DATA column that was filled by wsclean
         dp3_params = self.config['dp3_params']
         selfcal_params = self.config['selfcal_params']
         
+        if dp3_params['use_model_column']:
+            # Uses MODEL_DATA column that was filled by wsclean
+            model_settings = f"""cal.usemodelcolumn = true
+        cal.modelcolumn = {dp3_params['model_column']}"""
+        else:
+            # Predict on the fly from wsclean's source list, in the same pass
+            model_settings = f"""cal.usemodelcolumn = false
+        cal.sourcedb = /output/{model_name}-sources.txt"""
+        
         cal_parset = f"""
         msin.type = ms
-        msin.name = /data/{input_ms.name}
+        msin.name = /data/{ms.name}
+        msin.datacolumn = DATA
         msin.ntime = {dp3_params['ntime']}
+        msin.datause = {dp3_params.get('datause', 'dual')}
         
-        msout.type = ms
-        msout.name = /data/{output_ms.name}
-        msout.writefullresflag = {str(dp3_params['write_full_res_flag']).lower()}
+        msout = .
+        msout.datacolumn = CORRECTED_DATA
         
         steps = [cal]
         
@@ -214,8 +507,9 @@ class SelfCalPipeline:
         cal.soltype = {self.solver_type}
         cal.maxiter = {selfcal_params['max_iterations']}
         cal.tolerance = {selfcal_params['tolerance']}
-        cal.usemodelcolumn = {str(dp3_params['use_model_column']).lower()}
-        cal.modelcolumn = {dp3_params['model_column']}
+        {model_settings}
+        cal.parmdb = /output/cal_iter_{iteration}.h5
+        cal.applysolution = true
         """
         
         # Write parset to file
@@ -223,8 +517,8 @@ class SelfCalPipeline:
         with open(parset_file, 'w') as f:
             f.write(cal_parset)
         
-        # Run DP3
-        dp3_cmd = ["DP3", str(parset_file)]
+        # Run DP3 (parset path as seen inside the container)
+        dp3_cmd = ["DP3", f"/output/{parset_file.name}"]
         
         volumes = {
             str(self.ms_path.parent): "/data",
@@ -250,6 +544,13 @@ class SelfCalPipeline:
         # Pull LINC image
         self.pull_linc_image()
         
+        # One container for all steps; each step is a podman exec
+        try:
+            self._start_container()
+        except subprocess.CalledProcessError as e:
+            self.logger.warning(f"Could not start long-lived container ({e.stderr.strip()}), "
+                                "using one container per step")
+        
         # Test LINC tools
         if not self.test_linc_tools():
             self.logger.error("LINC tools test failed. Cannot proceed.")
@@ -258,23 +559,18 @@ class SelfCalPipeline:
         # Create initial image
         self.run_wsclean_imaging("initial_image", self.ms_path)
         
-        # Self-calibration iterations
-        current_ms = self.ms_path
-        
+        # Self-calibration iterations, all on the one MS: solutions go to
+        # cal_iter_N.h5, corrected data to CORRECTED_DATA
+        model_name = "initial_image"
         for iteration in range(1, self.selfcal_iterations + 1):
             self.logger.info(f"Starting self-calibration iteration {iteration}")
             
-            # Create output MS name
-            output_ms = self.ms_path.parent / f"{self.ms_path.stem}_cal_iter_{iteration}.ms"
-            
-            # Run calibration
-            self.run_dp3_calibration(iteration, current_ms, output_ms)
+            # Run calibration against the previous image's model
+            self.run_dp3_calibration(iteration, self.ms_path, model_name)
             
-            # Run imaging - this will fill MODEL_DATA column for next iteration
-            self.run_wsclean_imaging(f"image_iter_{iteration}", output_ms, iteration)
-            
-            # Update current MS for next iteration
-            current_ms = output_ms
+            # Run imaging - this provides the model for the next iteration
+            model_name = f"image_iter_{iteration}"
+            self.run_wsclean_imaging(model_name, self.ms_path, iteration)
             
             self.logger.info(f"Self-calibration iteration {iteration} completed")
         
@@ -300,45 +596,136 @@ class SelfCalPipeline:
             json.dump(report, f, indent=2)
         
         self.logger.info(f"Pipeline report saved to {report_file}")
+        
+        # Pipeline is finished: tear down the long-lived container
+        self.stop_container()
+
+
+def _allowed_cpus():
+    """Sorted ids of the CPUs this process may run on (all CPUs where the affinity call is missing)"""
+    affinity = getattr(os, "sched_getaffinity", None)
+    return sorted(affinity(0)) if affinity else list(range(os.cpu_count() or 1))
+
+def _worker_cpuset(n_jobs):
+    """
+    CPU list for this pool worker when n_jobs pipelines share the machine
+    
+    Workers are numbered by their multiprocessing identity, so each gets
+    its own block of the CPUs this process may use (and stays on one NUMA
+    node when the blocks line up with the nodes). The block is given as an
+    explicit list, since the allowed ids need not be contiguous.
+    """
+    identity = multiprocessing.current_process()._identity
+    worker = (identity[0] - 1) % n_jobs if identity else 0
+    cpus = _allowed_cpus()
+    per_job = max(1, len(cpus) // n_jobs)
+    block = cpus[worker * per_job:(worker + 1) * per_job] or cpus[-per_job:]
+    return ",".join(str(cpu) for cpu in block)
 
+def run_single_pipeline(ms_path, output_dir, log_level="INFO", config_file="selfcal_config.yml",
+                        iterations=None, n_jobs=1, memory=None):
+    """
+    Run the complete self-calibration pipeline on one measurement set
+    
+    Args:
+        ms_path: Path to measurement set
+        output_dir: Output directory for this MS
+        log_level: Logging level
+        config_file: Path to YAML configuration file
+        iterations: Number of self-cal iterations (optional, overrides config file)
+        n_jobs: Number of pipelines running concurrently; the wsclean memory
+                budget is divided between them and each is pinned to its
+                own block of CPUs
+        memory: Container memory limit, e.g. "64g" (optional)
+    
+    Returns:
+        True if the pipeline completed successfully
+    """
+    pipeline = SelfCalPipeline(
+        ms_path=ms_path,
+        output_dir=output_dir,
+        log_level=log_level,
+        config_file=config_file,
+        cpuset=_worker_cpuset(n_jobs) if n_jobs > 1 else None,
+        memory=memory,
+        n_jobs=n_jobs
+    )
+    
+    # Override iterations if specified on command line
+    if iterations is not None:
+        pipeline.selfcal_iterations = iterations
+    
+    try:
+        success = pipeline.run_selfcal_pipeline()
+        if success:
+            pipeline.generate_report()
+        return success
+    finally:
+        pipeline.stop_container()
+        pipeline.close_logging()
 
 def main():
     """Main function"""
     parser = argparse.ArgumentParser(description="Self-calibration pipeline using DP3 and wsclean via astronrd/linc")
-    parser.add_argument("ms_path", help="Path to measurement set")
-    parser.add_argument("--output-dir", default="./selfcal_output", help="Output directory")
+    parser.add_argument("ms_path", nargs="+", help="Path to measurement set(s)")
+    parser.add_argument("--output-dir", default="./selfcal_output",
+                        help="Output directory (one subdirectory per MS when several are given)")
     parser.add_argument("--iterations", type=int, help="Number of self-cal iterations (overrides config file)")
     parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
     parser.add_argument("--config", default="selfcal_config.yml", help="Path to YAML configuration file")
+    parser.add_argument("--memory", help="Memory limit per container, e.g. 64g")
+    parser.add_argument("--jobs", type=int,
+                        help="Number of measurement sets processed in parallel "
+                             "(default: CPU count / 8, at most the number of MSes)")
     
     args = parser.parse_args()
     
-    try:
-        # Create pipeline instance
-        pipeline = SelfCalPipeline(
-            ms_path=args.ms_path,
-            output_dir=args.output_dir,
-            log_level=args.log_level,
-            config_file=args.config
-        )
-        
-        # Override iterations if specified on command line
-        if args.iterations is not None:
-            pipeline.selfcal_iterations = args.iterations
-        
-        # Run pipeline
-        success = pipeline.run_selfcal_pipeline()
+    if len(args.ms_path) == 1:
+        try:
+            success = run_single_pipeline(args.ms_path[0], args.output_dir, args.log_level,
+                                          args.config, args.iterations, memory=args.memory)
+        except Exception as e:
+            print(f"Pipeline failed with error: {e}")
+            sys.exit(1)
         
         if success:
-            pipeline.generate_report()
             print("Self-calibration pipeline completed successfully!")
         else:
             print("Self-calibration pipeline failed!")
             sys.exit(1)
-            
-    except Exception as e:
-        print(f"Pipeline failed with error: {e}")
+        return
+    
+    # Independent measurement sets: one pipeline per MS, each in its own
+    # process and output subdirectory
+    n_jobs = args.jobs or max(1, len(_allowed_cpus()) // 8)
+    n_jobs = max(1, min(n_jobs, len(args.ms_path)))
+    print(f"Processing {len(args.ms_path)} measurement sets, {n_jobs} at a time")
+    
+    failed = []
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        futures = {
+            executor.submit(run_single_pipeline, ms_path,
+                            Path(args.output_dir) / Path(ms_path).stem,
+                            args.log_level, args.config, args.iterations, n_jobs,
+                            args.memory): ms_path
+            for ms_path in args.ms_path
+        }
+        for future in as_completed(futures):
+            ms_path = futures[future]
+            try:
+                success = future.result()
+            except Exception as e:
+                print(f"Pipeline failed for {ms_path} with error: {e}")
+                success = False
+            if success:
+                print(f"Self-calibration pipeline completed successfully: {ms_path}")
+            else:
+                failed.append(ms_path)
+    
+    if failed:
+        print(f"Self-calibration pipeline failed for: {', '.join(failed)}")
         sys.exit(1)
+    print("Self-calibration pipeline completed successfully!")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,33 @@
+#!/bin/bash
+# Start a local pull-through registry cache for Docker Hub images
+#
+# The first pull of astronrd/linc goes through to docker.io; later pulls
+# (e.g. on fresh VMs sharing this host) are served from the local volume.
+# Use it from the selfcal pipeline with:
+#   USE_LOCAL_CACHE=1 python3 selfcal_pipeline.py <ms_path>
+# which pulls localhost:5051/astronrd/linc:latest instead.
+
+NAME="reg-docker"
+PORT=5051
+
+if podman container exists "$NAME"; then
+    if [ "$(podman inspect --format '{{.State.Running}}' "$NAME")" = "true" ]; then
+        echo "Registry cache $NAME already running on port $PORT"
+    else
+        podman start "$NAME" > /dev/null && echo "Restarted registry cache $NAME on port $PORT"
+    fi
+    exit 0
+fi
+
+podman run -d --name "$NAME" \
+    -p ${PORT}:5000 \
+    -e REGISTRY_PROXY_REMOTEURL=https://registry-1.docker.io \
+    -v reg-docker-vol:/var/lib/registry \
+    docker.io/library/registry:2
+
+if [ $? -eq 0 ]; then
+    echo "Registry cache $NAME started on port $PORT"
+else
+    echo "Error: failed to start registry cache $NAME"
+    exit 1
+fi
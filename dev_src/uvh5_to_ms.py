@@ -9,13 +9,16 @@ Examples:
     python uvh5_to_ms.py data.uvh5
     python uvh5_to_ms.py data.uvh5 --output data.ms
     python uvh5_to_ms.py data.uvh5 --force
+    python uvh5_to_ms.py data.uvh5 --freq-chunks 8  # bounded memory
 
 Requires conda environment: conda activate /opt/devel/peijin/solarml
 """
 
 import os
 import sys
+import shutil
 import argparse
+import tempfile
 from pathlib import Path
 from pyuvdata import UVData
 
@@ -26,10 +29,13 @@ def parse_arguments():
     parser.add_argument('--output', '-o', help='Output MS file path', default=None)
     parser.add_argument('--force', '-f', action='store_true', help='Overwrite existing files')
     parser.add_argument('--verbose', '-v', action='store_true', help='Enable verbose output')
+    parser.add_argument('--freq-chunks', type=int, default=1,
+                        help='Convert in this many frequency blocks to bound memory use '
+                             '(blocks are merged back into one spectral window; default: 1)')
     parser.add_argument('--version', action='version', version='%(prog)s 1.0.0')
     return parser.parse_args()
 
-def uvh5_to_ms(in_uvh5, out_ms, verbose=False):
+def uvh5_to_ms(in_uvh5, out_ms, verbose=False, freq_chunks=1):
     """
     Convert UVH5 file to MS format using pyuvdata.
     
@@ -37,7 +43,12 @@ def uvh5_to_ms(in_uvh5, out_ms, verbose=False):
         in_uvh5 (str): Input UVH5 file path
         out_ms (str): Output MS file path
         verbose (bool): Enable verbose output
+        freq_chunks (int): Number of frequency blocks to convert separately;
+            peak memory is about 1/freq_chunks of the whole file
     """
+    if freq_chunks > 1:
+        return uvh5_to_ms_chunked(in_uvh5, out_ms, freq_chunks, verbose=verbose)
+    
     try:
         # Load UVH5 file with pyuvdata
         uv = UVData()
@@ -52,6 +63,53 @@ def uvh5_to_ms(in_uvh5, out_ms, verbose=False):
         print(f"Error during UVH5 to MS conversion: {e}")
         raise
 
+def uvh5_to_ms_chunked(in_uvh5, out_ms, freq_chunks, verbose=False):
+    """
+    Convert UVH5 file to MS one frequency block at a time.
+    
+    Each block is read with select-on-read and written to its own MS, so
+    only one block is ever in memory. The blocks (one spectral window each)
+    are joined with CASA concat and merged back into a single spectral
+    window with mstransform(combinespws=True), so out_ms has the same
+    layout as an unchunked conversion.
+    
+    Args:
+        in_uvh5 (str): Input UVH5 file path
+        out_ms (str): Output MS file path
+        freq_chunks (int): Number of frequency blocks
+        verbose (bool): Enable verbose output
+    """
+    from casatasks import concat, mstransform
+    
+    # Header only, to get the channel count
+    meta = UVData()
+    meta.read_uvh5(in_uvh5, read_data=False)
+    nfreqs = meta.Nfreqs
+    freq_chunks = min(freq_chunks, nfreqs)
+    bounds = [nfreqs * i // freq_chunks for i in range(freq_chunks + 1)]
+    
+    out_dir = Path(out_ms).resolve().parent
+    with tempfile.TemporaryDirectory(prefix="uvh5_to_ms_", dir=out_dir) as tmp:
+        part_mss = []
+        for i, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:])):
+            if verbose:
+                print(f"Converting channels {start}-{stop - 1} ({i + 1}/{freq_chunks})")
+            uv = UVData()
+            uv.read_uvh5(in_uvh5, freq_chans=range(start, stop))
+            part_ms = os.path.join(tmp, f"part{i:03d}.ms")
+            uv.write_ms(part_ms)
+            part_mss.append(part_ms)
+            del uv
+        
+        if verbose:
+            print(f"Concatenating {len(part_mss)} blocks into {out_ms}")
+        concat_ms = os.path.join(tmp, "concat.ms")
+        concat(vis=part_mss, concatvis=concat_ms)
+        mstransform(vis=concat_ms, outputvis=str(out_ms), datacolumn="data",
+                    combinespws=True)
+    
+    return out_ms
+
 def main():
     """Main function for command-line tool."""
     args = parse_arguments()
@@ -80,11 +138,11 @@ def main():
     
     # Clean up existing files if force is specified
     if args.force and output_ms.exists():
-        import shutil
         shutil.rmtree(output_ms)
     
     try:
-        uvh5_to_ms(str(input_uvh5), str(output_ms), verbose=args.verbose)
+        uvh5_to_ms(str(input_uvh5), str(output_ms), verbose=args.verbose,
+                   freq_chunks=args.freq_chunks)
         
     except Exception as e:
         print(f"Error during conversion: {e}")
@@ -1,23 +1,31 @@
+import sys
 import casatasks
 from ovrolwasolar import flagging
 import argparse
 from casatasks import flagdata, split
 
 
+# One or more "input_ms output_ms gaintable" triples, processed in this one
+# interpreter so CASA is imported once per batch rather than once per MS
 parser = argparse.ArgumentParser()
-parser.add_argument("input_ms", type=str)
-parser.add_argument("output_ms", type=str)
-parser.add_argument("gaintable", type=str)
+parser.add_argument("jobs", type=str, nargs='+', metavar="input_ms output_ms gaintable")
 
-args = parser.parse_args()
-input_ms = args.input_ms
-output_ms = args.output_ms
-gaintable = args.gaintable
+# Under "casa -c" sys.argv also holds casa's own options: keep only what
+# follows this script's path
+script_idx = next((i for i, a in enumerate(sys.argv) if a.endswith("flagant_applybp.py")), 0)
+args = parser.parse_args(sys.argv[script_idx + 1:])
+if len(args.jobs) % 3:
+    parser.error("arguments must be input_ms output_ms gaintable triples")
 
+for input_ms, output_ms, gaintable in zip(*[iter(args.jobs)] * 3):
+    # Flag the split copy, not input_ms: the raw MS is only read, so the
+    # pipeline can recognise it as unchanged on a rerun
+    split(vis=input_ms, outputvis=output_ms, datacolumn='data', keepflags=False)
+    flagging.flag_bad_ants(output_ms)
+    # Short-baseline flagging and auto-correlation unflagging in a single
+    # list-mode pass over the MS (commands are applied in order)
+    flagdata(vis=output_ms, mode='list', flagbackup=False,
+             inpfile=["mode='manual' uvrange='0.1~10lambda'",
+                      "mode='unflag' correlation='auto'"])
 
-flagging.flag_bad_ants(input_ms)
-flagdata(vis=input_ms, mode='manual', uvrange='0.1~10lambda', flagbackup=False)
-flagdata(vis=input_ms, mode='unflag', correlation='auto')
-split(vis=input_ms, outputvis=output_ms, datacolumn='data', keepflags=False)
-
-casatasks.applycal( vis=output_ms,gaintable=gaintable, applymode='calflag')
\ No newline at end of file
+    casatasks.applycal( vis=output_ms,gaintable=gaintable, applymode='calflag')
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""
+DP3 parset templates for the pipeline steps
+
+Each template is compiled once at import; a step substitutes its paths and
+options and passes the result to DP3 as key=value command-line arguments,
+so no parset file is written.
+"""
+from string import Template
+
+FLAG_AVG = Template("""msin=$msin
+numthreads=$numthreads
+msout=$msout
+msin.datacolumn=CORRECTED_DATA
+steps=[flag,avg]
+flag.type=aoflagger
+flag.strategy=$strategy
+avg.type=averager
+avg.freqstep=4
+""")
+
+# msout=. with applysolution=false solves only; a new msout with
+# applysolution=true also writes the corrected data in the same pass
+GAINCAL = Template("""msin=$msin
+numthreads=$numthreads
+msout=$msout
+showprogress=False
+verbosity="quiet"
+steps=[gaincal]
+gaincal.solint=0
+gaincal.caltype=$caltype
+gaincal.uvlambdamin=30
+gaincal.maxiter=500
+gaincal.tolerance=1e-5
+gaincal.usemodelcolumn=true
+gaincal.modelcolumn=MODEL_DATA
+gaincal.parmdb=$parmdb
+gaincal.applysolution=$applysolution
+""")
+
+# $corrections holds one applycal.<entry>.correction=<entry>000 per entry
+APPLYCAL = Template("""msin=$msin
+numthreads=$numthreads
+msout=$msout
+steps=[applycal]
+showprogress=False
+verbosity="quiet"
+applycal.parmdb=$parmdb
+applycal.steps=[$entries]
+$corrections
+""")
+
+SUBTRACT = Template("""msin=$msin
+numthreads=$numthreads
+showprogress=False
+verbosity="quiet"
+msout=.
+msout.datacolumn=$datacolumn
+steps=[predict]
+predict.type=predict
+predict.sourcedb=$sourcedb
+predict.operation=subtract
+""")
+
+PHASESHIFT = Template("""msin=$msin
+msin.datacolumn=$datacolumn
+msout=$msout
+numthreads=$numthreads
+showprogress=False
+verbosity="quiet"
+steps=[phaseshift]
+phaseshift.type=phaseshift
+phaseshift.phasecenter=[${ra}deg,${dec}deg]
+""")
+
+PHASESHIFT_AVG = Template(PHASESHIFT.template.replace("steps=[phaseshift]", "steps=[phaseshift,avg]") + """avg.type=averager
+avg.freqstep=$freqstep
+""")
+
+# Source subtraction fused in front of the phase shift, so the subtracted
+# data go straight into the shifted MS without an in-place column write
+_PREDICT = """predict.type=predict
+predict.sourcedb=$sourcedb
+predict.operation=subtract
+"""
+
+SUBTRACT_PHASESHIFT = Template(PHASESHIFT.template.replace(
+    "steps=[phaseshift]", "steps=[predict,phaseshift]") + _PREDICT)
+
+SUBTRACT_PHASESHIFT_AVG = Template(PHASESHIFT_AVG.template.replace(
+    "steps=[phaseshift,avg]", "steps=[predict,phaseshift,avg]") + _PREDICT)
+
+AVG = Template("""msin=$msin
+numthreads=$numthreads
+msout=$msout
+steps=[avg]
+showprogress=False
+verbosity="quiet"
+avg.type=averager
+avg.freqstep=$freqstep
+""")
+
+def render(template, **params):
+    """Substitute params into template and return the DP3 command-line arguments"""
+    return template.substitute(**params).split()
@@ -5,21 +5,75 @@ Complete workflow: raw MS -> CASA applycal -> DP3 flag/avg -> wsclean -> gaincal
 """
 import subprocess, sys, os
 import time
+import hashlib
 from pathlib import Path
 import shutil
+import tempfile
+import threading
 import argparse
+import shlex
+import re
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 import wsclean_imaging
+import parset_templates
+from subprocess_utils import run_streaming
+from step_cache import memoized_step
+from prefetch_utils import fadvise_willneed
 from source_list import get_time_mjd, get_Sun_RA_DEC, mask_far_Sun_sources
 
 PIPELINE_SCRIPT_DIR = Path(__file__).parent
 EXECUTABLE_DIR = Path(__file__).parent / "exe"
+STRATEGY_FILE = PIPELINE_SCRIPT_DIR / "lua" / "LWA_sun_PZ.lua"
+
+# Frequency chunks of the selfcal model image: wsclean grids them in
+# parallel and predicts a per-chunk model for the per-channel gaincal
+SELFCAL_FREQ_CHUNKS = 4
+
+# Cap on wsclean major cycles (each one re-grids all visibilities) for the
+# imaging runs that only feed MODEL_DATA or the source list
+MODEL_NMITER = 8
+
+# Threads for DP3 (numthreads) and wsclean (-j): the CPUs this process may
+# run on, so a container started with --cpuset-cpus is not oversubscribed
+# (all CPUs where the affinity call is missing, e.g. off Linux)
+_sched_getaffinity = getattr(os, "sched_getaffinity", None)
+N_THREADS = len(_sched_getaffinity(0)) if _sched_getaffinity else (os.cpu_count() or 1)
+
+# Pipeline code the memoized step outputs depend on
+_CODE_KEY = hashlib.blake2b(
+    Path(__file__).read_bytes() + Path(parset_templates.__file__).read_bytes()
+    + (EXECUTABLE_DIR / "flagant_applybp.py").read_bytes(),
+    digest_size=16).hexdigest()
 
 def run_casa_applycal(input_ms, output_ms, gaintable):
     """Apply CASA bandpass calibration"""
-    print(f"Step : CASA applycal - {input_ms}")
+    run_casa_applycal_batch([(input_ms, output_ms, gaintable)])
+
+def _casa_launcher():
+    """
+    Command prefix for running a CASA script
+    
+    mpicasa over N_THREADS processes when LWA_USE_MPICASA=1 and mpicasa is
+    installed, otherwise plain python3 with the casatasks modules.
+    """
+    if os.environ.get("LWA_USE_MPICASA") == "1":
+        if shutil.which("mpicasa") and shutil.which("casa"):
+            return ["mpicasa", "-n", str(N_THREADS), "casa", "--nogui", "--nologger", "-c"]
+        print("LWA_USE_MPICASA=1 but mpicasa/casa not found, using serial python3")
+    return ["python3"]
+
+def run_casa_applycal_batch(jobs):
+    """Apply CASA bandpass calibration to (input_ms, output_ms, gaintable) jobs in one CASA session"""
+    print(f"Step : CASA applycal - {', '.join(str(job[0]) for job in jobs)}")
     start_time = time.time()
+    # split refuses to overwrite an output left by an earlier run
+    for _, output_ms, _ in jobs:
+        if os.path.isdir(output_ms):
+            shutil.rmtree(output_ms)
     try:
-        subprocess.run(["python3", str(EXECUTABLE_DIR / "flagant_applybp.py"), str(input_ms), str(output_ms), str(gaintable)], check=True)
+        subprocess.run([*_casa_launcher(), str(EXECUTABLE_DIR / "flagant_applybp.py"),
+                        *(str(arg) for job in jobs for arg in job)], check=True)
         elapsed = time.time() - start_time
         print(f"✓ CASA applycal completed ({elapsed:.1f}s)")
     except subprocess.CalledProcessError as e:
@@ -46,27 +100,39 @@ def run_dp3_flag_avg(input_ms, output_ms, strategy_file=None):
     print(f"Strategy file: {strategy_file_path_str}")
 
     # Create DP3 parset - use simple filenames since we're in /data
-    parset_content = f"""msin={str(input_path)} 
-        msout={str(output_path)}
-        msin.datacolumn=CORRECTED_DATA
-        steps=[flag,avg]
-        flag.type=aoflagger
-        flag.strategy={strategy_file_path_str}
-        avg.type=averager
-        avg.freqstep=4
-        """
+    parset_args = parset_templates.render(parset_templates.FLAG_AVG, msin=input_path,
+        numthreads=N_THREADS, msout=output_path, strategy=strategy_file_path_str)
 #flag.keepstatistics=false
 
-    cmd = ["DP3", *parset_content.split()]
+    cmd = ["DP3", *parset_args]
     try:
-        subprocess.run(cmd, check=True, capture_output=True, text=True)
+        run_streaming(cmd)
         elapsed = time.time() - start_time
         print(f"✓ DP3 flag/avg completed ({elapsed:.1f}s): {output_ms}")
     except subprocess.CalledProcessError as e:
         elapsed = time.time() - start_time
-        print(f"✗ DP3 flag/avg failed after {elapsed:.1f}s: {e.stdout}")
+        print(f"✗ DP3 flag/avg failed after {elapsed:.1f}s, last DP3 output:\n{e.output}")
         sys.exit(1)
 
+def _dir_size(path):
+    """Total size in bytes of the files under path"""
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total
+
+def wsclean_scratch_base(input_ms):
+    """
+    Directory for wsclean's reordered visibilities
+    
+    /dev/shm when it has room for a copy of the MS, otherwise the default
+    temporary directory (set TMPDIR to point it at fast local disk).
+    """
+    shm = "/dev/shm"
+    if os.path.isdir(shm) and shutil.disk_usage(shm).free > _dir_size(input_ms):
+        return shm
+    return tempfile.gettempdir()
+
 def run_wsclean_imaging(input_ms, output_prefix="image", auto_pix_fov=True, **kwargs):
     """WSClean imaging"""
     print(f"Step : WSClean imaging - {input_ms}")
@@ -74,6 +140,15 @@ def run_wsclean_imaging(input_ms, output_prefix="image", auto_pix_fov=True, **kw
     
     input_path = Path(input_ms)
     
+    kwargs.setdefault('j', N_THREADS)
+    
+    # Reorder the MS once into scratch on fast storage, so the major
+    # iterations read the reordered copy instead of the MS
+    temp_dir = tempfile.mkdtemp(prefix="wsclean_", dir=wsclean_scratch_base(input_path))
+    kwargs.setdefault('no_reorder', False)
+    kwargs.setdefault('reorder', True)
+    kwargs.setdefault('temp_dir', temp_dir)
+    
     # Generate WSClean command using utils
     wsclean_cmd_str = wsclean_imaging.make_wsclean_cmd(
         msfile=input_path,  imagename=output_prefix,
@@ -84,13 +159,15 @@ def run_wsclean_imaging(input_ms, output_prefix="image", auto_pix_fov=True, **kw
     
     cmd = ["wsclean"] + wsclean_args + [str(input_path)]
     try:
-        subprocess.run(cmd, check=True, capture_output=True, text=True)
+        run_streaming(cmd, tail_lines=50, echo=False)
         elapsed = time.time() - start_time
         print(f"✓ WSClean imaging completed ({elapsed:.1f}s): {output_prefix}*.fits")
     except subprocess.CalledProcessError as e:
         elapsed = time.time() - start_time
-        print(f"✗ WSClean imaging failed after {elapsed:.1f}s: {e}")
+        print(f"✗ WSClean imaging failed after {elapsed:.1f}s, last wsclean output:\n{e.output}")
         sys.exit(1)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
 
 def run_gaincal(input_ms, solution_fname="solution.h5", cal_type="diagonalphase"):
     """DP3 gain calibration"""
@@ -100,58 +177,112 @@ def run_gaincal(input_ms, solution_fname="solution.h5", cal_type="diagonalphase"
     input_path = Path(input_ms)
 #msout = /data/{input_path.name}_cal.ms
     
-    parset_content = f"""msin={str(input_path)}
-        showprogress=False
-        verbosity="quiet"
-        steps=[gaincal]
-        msout=.
-        gaincal.solint=0
-        gaincal.caltype={cal_type}
-        gaincal.uvlambdamin=30
-        gaincal.maxiter=500
-        gaincal.tolerance=1e-5
-        gaincal.usemodelcolumn=true
-        gaincal.modelcolumn=MODEL_DATA
-        gaincal.parmdb={solution_fname}
-        """
-    
-    cmd = ["DP3", *parset_content.split()]
+    parset_args = parset_templates.render(parset_templates.GAINCAL, msin=input_path,
+        numthreads=N_THREADS, msout=".", caltype=cal_type, parmdb=solution_fname,
+        applysolution="false")
+    
+    cmd = ["DP3", *parset_args]
     
     try:
-        res = subprocess.run(cmd, check=True, capture_output=True, text=True)
+        run_streaming(cmd)
         elapsed = time.time() - start_time
         print(f"✓ DP3 gaincal completed ({elapsed:.1f}s): solution.h5")
     except subprocess.CalledProcessError as e:
         elapsed = time.time() - start_time
-        print(f"✗ DP3 gaincal failed after {elapsed:.1f}s: {e}")
+        print(f"✗ DP3 gaincal failed after {elapsed:.1f}s, last DP3 output:\n{e.output}")
         sys.exit(1)
     
+def run_gaincal_applycal(input_ms, output_ms, solution_fname="solution.h5", cal_type="diagonalphase"):
+    """DP3 gain calibration and application of the solutions in a single pass"""
+    print(f"Step : DP3 gaincal+applycal - {input_ms} -> {output_ms}")
+    start_time = time.time()
+    
+    input_path = Path(input_ms)
+    output_path = Path(output_ms)
+    
+    # gaincal.applysolution corrects the data with the solutions it just
+    # solved, so the MS is read once instead of once per gaincal/applycal;
+    # solutions are still written to solution_fname
+    parset_args = parset_templates.render(parset_templates.GAINCAL, msin=input_path,
+        numthreads=N_THREADS, msout=output_path, caltype=cal_type, parmdb=solution_fname,
+        applysolution="true")
+    
+    cmd = ["DP3", *parset_args]
+    
+    try:
+        run_streaming(cmd)
+        elapsed = time.time() - start_time
+        print(f"✓ DP3 gaincal+applycal completed ({elapsed:.1f}s): {output_ms}")
+    except subprocess.CalledProcessError as e:
+        elapsed = time.time() - start_time
+        print(f"✗ DP3 gaincal+applycal failed after {elapsed:.1f}s, last DP3 output:\n{e.output}")
+        sys.exit(1)
+
 import h5py
 import numpy as np
 
-def reset_solution_outliers(h5fname, N_sigma=3, reset=True):
+def _copy_h5_compressed(src, dst, replace=None):
+    """
+    Copy an h5 group tree, gzip+shuffle compressing the float cubes
+
+    Multi-dimensional float datasets (solution val/weight) are chunked per
+    time slot; everything else is copied as is. replace maps dataset names
+    to arrays written instead of the source data. gzip, unlike lzf, is
+    built into libhdf5, so DP3 can still read the file.
+    """
+    replace = replace or {}
+    dst.attrs.update(src.attrs)
+    for key, item in src.items():
+        if isinstance(item, h5py.Group):
+            _copy_h5_compressed(item, dst.create_group(key), replace)
+        elif item.ndim >= 2 and item.dtype.kind == 'f' and 0 not in item.shape:
+            data = replace.get(item.name)
+            new = dst.create_dataset(key, data=item[()] if data is None else data,
+                chunks=(1,) + item.shape[1:], compression='gzip', compression_opts=1,
+                shuffle=True)
+            new.attrs.update(item.attrs)
+        else:
+            src.copy(item, dst, name=key)
+
+def reset_solution_outliers(h5fname, N_sigma=3, reset=True, compress=False):
+    """
+    Flag amplitude solutions of antennas that are N_sigma outliers
+
+    compress: rewrite the whole file with compressed, per-time chunked
+        solution cubes (written to a temporary file, then moved over
+        h5fname) instead of updating it in place
+    """
     start_time = time.time()
-    with h5py.File(h5fname, 'r') as f:
-        amp_val = f["sol000"]["amplitude000"]["val"][:]
-        weight_val = f["sol000"]["amplitude000"]["weight"][:]
+    # queue readahead of the whole file before h5py's small chunked reads
+    fadvise_willneed([h5fname])
+    # one open: the cubes are edited in memory and written back into the
+    # existing datasets (only if any outlier was found), or into the
+    # compressed copy
+    with h5py.File(h5fname, 'r' if compress else 'r+') as f:
+        amp_dset = f["sol000/amplitude000/val"]
+        weight_dset = f["sol000/amplitude000/weight"]
+        amp_val = amp_dset[()]
+        weight_val = weight_dset[()]
         
-    for i in range(amp_val.shape[0]): # time
-        for j in range(amp_val.shape[1]): # freq
-            for k in range(amp_val.shape[3]): # pol
-                outliers = np.where(
-                    (amp_val[i,j,:,k] > np.nanmean(amp_val[i,j,:,k]) + N_sigma * np.nanstd(amp_val[i,j,:,k]))
-                    | (amp_val[i,j,:,k] < np.nanmean(amp_val[i,j,:,k]) - N_sigma * np.nanstd(amp_val[i,j,:,k]))
-                )[0]
-                if reset:
-                    amp_val[i,j,outliers,k] = np.nan
-                    weight_val[i,j,outliers,k] = 0
-                else:
-                    amp_val[i,j,outliers,k] = 1
-                    weight_val[i,j,outliers,k] = 0
-
-    with h5py.File(h5fname ,'a') as f:
-        f["sol000"]["amplitude000"]["val"][:] = amp_val
-        f["sol000"]["amplitude000"]["weight"][:] = weight_val
+        # axes are (time, freq, ant, pol): antennas more than N_sigma from the
+        # mean over antennas of their (time, freq, pol) cell are outliers
+        mu = np.nanmean(amp_val, axis=2, keepdims=True)
+        sigma = np.nanstd(amp_val, axis=2, keepdims=True)
+        outliers = np.abs(amp_val - mu) > N_sigma * sigma
+        if outliers.any():
+            amp_val[outliers] = np.nan if reset else 1
+            weight_val[outliers] = 0
+            if not compress:
+                amp_dset.write_direct(amp_val)
+                weight_dset.write_direct(weight_val)
+
+        if compress:
+            tmp_fname = f"{h5fname}.tmp"
+            with h5py.File(tmp_fname, 'w') as out:
+                _copy_h5_compressed(f, out, replace={amp_dset.name: amp_val,
+                                                     weight_dset.name: weight_val})
+    if compress:
+        os.replace(tmp_fname, h5fname)
 
     elapsed = time.time() - start_time
     print(f"✓ Reset solution outliers completed ({elapsed:.1f}s): {h5fname}")
@@ -165,19 +296,13 @@ def run_applycal_dp3(input_ms,  output_ms, solution_fname="solution.h5", cal_ent
     input_path = Path(input_ms)
     output_path = Path(output_ms)
     
-    parset_content = f"""msin={str(input_path)}
-        msout={str(output_path)}
-        steps=[applycal]
-        showprogress=False
-        verbosity="quiet"
-        applycal.parmdb={str(solution_fname)}
-        applycal.steps=[{','.join(cal_entry_lst)}] \n
-        """
-    for cal_entry in cal_entry_lst:
-        parset_content += f"applycal.{cal_entry}.correction={cal_entry}000 \n"
- 
-
-    cmd = ["DP3", *parset_content.split()]
+    corrections = "\n".join(f"applycal.{cal_entry}.correction={cal_entry}000"
+                            for cal_entry in cal_entry_lst)
+    parset_args = parset_templates.render(parset_templates.APPLYCAL, msin=input_path,
+        numthreads=N_THREADS, msout=output_path, parmdb=solution_fname,
+        entries=','.join(cal_entry_lst), corrections=corrections)
+
+    cmd = ["DP3", *parset_args]
     try:
         subprocess.run(cmd, check=True)
         elapsed = time.time() - start_time
@@ -189,39 +314,54 @@ def run_applycal_dp3(input_ms,  output_ms, solution_fname="solution.h5", cal_ent
     
 
 
-def run_dp3_subtract(input_ms, output_ms, source_list):
-    """DP3 subtract"""
-    print(f"Step : DP3 subtract - {input_ms} -> {output_ms}")
+def run_dp3_subtract(input_ms, source_list, out_datacolumn="SUBTRACTED_DATA"):
+    """DP3 subtract, written in place to a new column of input_ms"""
+    print(f"Step : DP3 subtract - {input_ms} -> {out_datacolumn}")
     start_time = time.time()
     
     input_path = Path(input_ms)
-    output_path = Path(output_ms)
     source_path = Path(source_list)
     
-    parset_content = f"""msin={str(input_path)}
-        showprogress=False
-        verbosity="quiet"
-        msout={str(output_path)}
-        steps=[predict]
-        predict.type=predict
-        predict.sourcedb={str(source_path)}
-        predict.operation=subtract
-        """
+    # msout=. adds out_datacolumn to the input MS instead of copying the
+    # whole MS into a new one
+    parset_args = parset_templates.render(parset_templates.SUBTRACT, msin=input_path,
+        numthreads=N_THREADS, datacolumn=out_datacolumn, sourcedb=source_path)
         
-    cmd = ["DP3", *parset_content.split()]
+    cmd = ["DP3", *parset_args]
     
     try:
         subprocess.run(cmd, check=True)
         elapsed = time.time() - start_time
-        print(f"✓ DP3 subtract completed ({elapsed:.1f}s): {output_ms}")
+        print(f"✓ DP3 subtract completed ({elapsed:.1f}s): {input_ms} {out_datacolumn}")
     except subprocess.CalledProcessError as e:
         elapsed = time.time() - start_time
         print(f"✗ DP3 subtract failed after {elapsed:.1f}s: {e}")
         sys.exit(1)
     
 
-def phaseshift_to_sun(ms_file, output_ms):
-    """Phase shift MS to Sun's coordinates using DP3 PhaseShift step."""
+@lru_cache(maxsize=32)
+def _sun_radec_at(time_mjd):
+    """Sun's (RA, Dec) in degrees at an MJD, cached: the subbands of one
+    observation share a start time, so a batch worker computes it once"""
+    sun_ras, sun_decs = get_Sun_RA_DEC(np.atleast_1d(time_mjd))
+    return sun_ras[0], sun_decs[0]
+
+def sun_radec_for_ms(ms_file):
+    """Sun's (RA, Dec) in degrees at the observation time of an MS"""
+    return _sun_radec_at(float(get_time_mjd(str(ms_file))))
+
+def phaseshift_to_sun(ms_file, output_ms, sun_radec=None, datacolumn="DATA", freq_step=None,
+                      subtract_sourcedb=None):
+    """Phase shift MS to Sun's coordinates using DP3 PhaseShift step.
+    
+    sun_radec: Sun (RA, Dec) in degrees, if already known for this
+        observation; otherwise computed from the MS time
+    datacolumn: column of ms_file to read; written as DATA in output_ms
+    freq_step: if set, also average this many channels in the same DP3
+        run, instead of writing the shifted MS and averaging it separately
+    subtract_sourcedb: if set, first subtract this source list in the same
+        DP3 run, instead of run_dp3_subtract writing a column to ms_file
+    """
     ms_path = Path(ms_file)
     output_path = Path(output_ms)
     if not ms_path.exists():
@@ -229,29 +369,35 @@ def phaseshift_to_sun(ms_file, output_ms):
     start_time = time.time()
 
     # Get Sun position
-    time_mjd = get_time_mjd(str(ms_path))
-    sun_ra, sun_dec = get_Sun_RA_DEC(time_mjd)
-    
-    # Create parset content - use simple filenames
-    parset_content = f"""msin={str(ms_path)}
-        msout={str(output_path)}
-        showprogress=False
-        verbosity="quiet"
-        steps=[phaseshift]
-        phaseshift.type=phaseshift
-        phaseshift.phasecenter=[{sun_ra}deg,{sun_dec}deg]
-        """
-    
-    cmd = ["DP3", *parset_content.split()]
+    if sun_radec is None:
+        sun_radec = sun_radec_for_ms(ms_path)
+    sun_ra, sun_dec = sun_radec
+    
+    # Parset keys go straight on the DP3 command line: no parset file is
+    # written, so nothing touches the (possibly network) filesystem
+    params = dict(msin=ms_path, datacolumn=datacolumn, msout=output_path, numthreads=N_THREADS,
+                  ra=sun_ra, dec=sun_dec)
+    if freq_step is None:
+        template = parset_templates.PHASESHIFT
+    else:
+        template = parset_templates.PHASESHIFT_AVG
+        params["freqstep"] = freq_step
+    if subtract_sourcedb is not None:
+        template = (parset_templates.SUBTRACT_PHASESHIFT if freq_step is None
+                    else parset_templates.SUBTRACT_PHASESHIFT_AVG)
+        params["sourcedb"] = subtract_sourcedb
+    parset_args = parset_templates.render(template, **params)
+    cmd = ["DP3", *parset_args]
     
     try:
-        subprocess.run(cmd, check=True)
+        run_streaming(cmd)
         elapsed = time.time() - start_time  
         print(f"✓ DP3 phase shift completed ({elapsed:.1f}s): {output_path}")
         return str(output_path)
 
     except subprocess.CalledProcessError as e:
-        print(f"✗ DP3 phase shift failed after {elapsed:.1f}s: {e.stdout}")
+        elapsed = time.time() - start_time
+        print(f"✗ DP3 phase shift failed after {elapsed:.1f}s, last DP3 output:\n{e.output}")
         sys.exit(1)
     
 
@@ -263,16 +409,10 @@ def run_dp3_avg(input_ms, output_ms, freq_step=4):
     input_path = Path(input_ms)
     output_path = Path(output_ms)
     
-    parset_content = f"""msin={str(input_path)}
-        msout={str(output_path)}
-        steps=[avg]        
-        showprogress=False
-        verbosity="quiet"
-        avg.type=averager
-        avg.freqstep={freq_step}
-        """
+    parset_args = parset_templates.render(parset_templates.AVG, msin=input_path,
+        numthreads=N_THREADS, msout=output_path, freqstep=freq_step)
         
-    cmd = ["DP3", *parset_content.split()]
+    cmd = ["DP3", *parset_args]
     
     try:
         subprocess.run(cmd, check=True)
@@ -283,16 +423,76 @@ def run_dp3_avg(input_ms, output_ms, freq_step=4):
         print(f"✗ DP3 frequency averaging failed after {elapsed:.1f}s: {e}")
         sys.exit(1)
 
-def run_calib_pipeline(raw_ms, gaintable, output_prefix="proc", plot_mid_steps=False, rm_ms_tmp=False, DEBUG=False, fch_img=True, mfs_img=False):
-    """Run complete processing pipeline"""
+def _files_under(path):
+    """
+    path itself if it is a file, else the table data files below it
+
+    Only casacore's table.f* storage files are listed for a directory: the
+    table.dat/table.info/lock files are tiny and read anyway on open.
+    """
+    if not os.path.isdir(path):
+        yield path
+        return
+    for root, _, files in os.walk(path):
+        for name in files:
+            if name.startswith("table.f"):
+                yield os.path.join(root, name)
+
+def prefetch(*paths):
+    """
+    Start pulling MS/table files into the page cache in the background
+    
+    Lets the next step's input be read from storage while the current
+    step (or CASA's import) is still busy, instead of cold at step start.
+    """
+    files = (file_path for path in paths for file_path in _files_under(str(path)))
+    threading.Thread(target=fadvise_willneed, args=(files,), daemon=True).start()
+
+def applied_bp_ms_path(raw_ms):
+    """Path of the bandpass-applied MS written for raw_ms in step 1"""
+    raw_path = Path(raw_ms)
+    return raw_path.parent / f"{raw_path.stem}_applied_bp.ms"
+
+def flagged_avg_ms_path(raw_ms):
+    """Path of the flagged and averaged MS written for raw_ms in step 2"""
+    raw_path = Path(raw_ms)
+    return raw_path.parent / f"{raw_path.stem}_flagged_avg.ms"
+
+@memoized_step(_CODE_KEY)
+def run_flag_avg_steps(raw_ms, flagged_avg_ms, gaintable, strategy_file, bp_applied=False):
+    """
+    Steps 1-2: CASA bandpass applycal and DP3 flagging/averaging
+
+    Memoized as one step, so a rerun on the same raw MS, gain table,
+    strategy and code skips both (flagged_avg_ms is kept with --keep-ms-tmp)
+    """
+    # Step 1: casatools applycal
+    applied_bp_ms = applied_bp_ms_path(raw_ms)
+    if not bp_applied:
+        run_casa_applycal(raw_ms, str(applied_bp_ms), gaintable)
+    
+    # Step 2: DP3 flagging and averaging, assuming corrected data column exists
+    run_dp3_flag_avg(applied_bp_ms, flagged_avg_ms, strategy_file=strategy_file)
+    return str(flagged_avg_ms)
+
+def run_calib_pipeline(raw_ms, gaintable, output_prefix="proc", plot_mid_steps=False, rm_ms_tmp=False, DEBUG=False, fch_img=True, mfs_img=False,
+        bp_applied=False, final_freq_step=4):
+    """Run complete processing pipeline
+    
+    bp_applied: step 1 (CASA applycal) has already been run for raw_ms,
+        e.g. by run_pipeline_batch
+    final_freq_step: channels averaged for the final images. With 1 (no
+        averaging) and a wsclean that supports -shift, the final images are
+        made straight from the subtracted data with the phase centre
+        shifted to the Sun, and no shifted MS is written
+    """
     
     pipeline_start = time.time()
     raw_path = Path(raw_ms)
     data_dir = raw_path.parent
     
     # Define intermediate file paths
-    applied_bp_ms = data_dir / f"{raw_path.stem}_applied_bp.ms"
-    flagged_avg_ms = data_dir / f"{raw_path.stem}_flagged_avg.ms"
+    flagged_avg_ms = flagged_avg_ms_path(raw_path)
     solution_file = data_dir / f"{output_prefix}_solution.h5"
     final_ms = data_dir / f"{raw_path.stem}_{output_prefix}_final.ms"
     
@@ -304,53 +504,80 @@ def run_calib_pipeline(raw_ms, gaintable, output_prefix="proc", plot_mid_steps=F
     print(f"Output prefix: {output_prefix}")
     print("="*60)
 
-    # Step 1: casatools applycal
-    run_casa_applycal(raw_ms, str(applied_bp_ms), gaintable)
-    
-    # Step 2: DP3 flagging and averaging, assuming corrected data column exists
-    run_dp3_flag_avg(applied_bp_ms, flagged_avg_ms, strategy_file=PIPELINE_SCRIPT_DIR / "lua" / "LWA_sun_PZ.lua")
+    # Steps 1-2, skipped when flagged_avg_ms was already made from the
+    # same inputs (see memoized_step)
+    prefetch(raw_path, gaintable)
+    run_flag_avg_steps(raw_path, flagged_avg_ms, gaintable, STRATEGY_FILE, bp_applied=bp_applied)
+    prefetch(flagged_avg_ms)
 
     if rm_ms_tmp:
         shutil.rmtree(raw_ms)
+        shutil.rmtree(applied_bp_ms_path(raw_path), ignore_errors=True)
 
     current_ms = flagged_avg_ms
+    # Frequency for the image pixel scale: read once here, since
+    # calibration keeps the channels of the later MSes unchanged
+    ms_freq = wsclean_imaging.get_freq_from_ms(current_ms)
     # selfcal:
     run_wsclean_imaging(current_ms, str(data_dir / f"{output_prefix}_image"), niter=800, mgain=0.9,horizon_mask=5,
-        save_source_list=False, auto_mask=False, auto_threshold=False)
-    run_gaincal(current_ms, solution_fname=str(solution_file), cal_type="diagonalphase")
-    run_applycal_dp3(current_ms,final_ms, solution_fname=str(solution_file), cal_entry_lst=["phase"])
+        freq=ms_freq, save_source_list=False, auto_mask=5, auto_threshold=3, nmiter=MODEL_NMITER,
+        channels_out=SELFCAL_FREQ_CHUNKS, join_channels=True, parallel_gridding=SELFCAL_FREQ_CHUNKS)
+    run_gaincal_applycal(current_ms, final_ms, solution_fname=str(solution_file), cal_type="diagonalphase")
 
     if rm_ms_tmp:
         shutil.rmtree(current_ms)
-
-    # Step 6: wsclean for source subtraction
-    run_wsclean_imaging(final_ms, str(data_dir / f"{output_prefix}_image_source"), niter=1500, mgain=0.9,horizon_mask=0.1 )#, multiscale=True)
+        (data_dir / f".{current_ms.name}.done").unlink(missing_ok=True)
+
+    # Step 6: wsclean for source subtraction; the Sun ephemeris only needs
+    # the MS time, so it is computed in a thread while wsclean runs
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        sun_future = executor.submit(sun_radec_for_ms, final_ms)
+        # Only the source list is needed downstream: no dirty image and
+        # no MODEL_DATA write, whatever make_wsclean_cmd defaults become
+        run_wsclean_imaging(final_ms, str(data_dir / f"{output_prefix}_image_source"), niter=1500, mgain=0.9,horizon_mask=0.1,
+            freq=ms_freq, save_source_list=True, no_dirty=True, no_update_model_required=True,
+            nmiter=MODEL_NMITER)#, multiscale=True)
+        sun_ra, sun_dec = sun_future.result()
     
     # Step 7: mask far Sun sources
-    time_mjd = get_time_mjd(str(final_ms))
-    sun_ra, sun_dec = get_Sun_RA_DEC(time_mjd)
     mask_far_Sun_sources( data_dir / f"{output_prefix}_image_source-sources.txt" , 
         data_dir / f"{output_prefix}_image_source_masked-sources.txt", 
         sun_ra, sun_dec, distance_deg=6.0)
 
-    # Step 8: DP3 subtract sources
-    subtracted_ms = data_dir / f"{output_prefix}_image_source_masked_subtracted.ms"
-    print(f"Subtracting sources from {final_ms} to {subtracted_ms}", str(data_dir / f"{output_prefix}_image_source_masked-sources.txt"))
-    run_dp3_subtract(final_ms, subtracted_ms, str(data_dir / f"{output_prefix}_image_source_masked-sources.txt"))
-
-    # step 9: phaseshift to sun
-    shifted_ms = data_dir / f"{output_prefix}_image_source_sun_shifted.ms"
-    print(f"Phaseshifting to sun from {subtracted_ms} to {shifted_ms}")
-    phaseshift_to_sun(subtracted_ms, shifted_ms)
-    if rm_ms_tmp:
-        shutil.rmtree(final_ms)
-        shutil.rmtree(subtracted_ms)
+    # Step 8: DP3 subtract sources. Unless SUBTRACTED_DATA itself is
+    # imaged (DEBUG, or shifting in wsclean), the subtraction is done in
+    # the step 9 DP3 pass instead of writing the column to final_ms
+    masked_source_list = str(data_dir / f"{output_prefix}_image_source_masked-sources.txt")
+    shift_in_wsclean = final_freq_step == 1 and wsclean_supports_shift()
+    fuse_subtract = not (shift_in_wsclean or DEBUG)
+    if not fuse_subtract:
+        print(f"Subtracting sources from {final_ms} into SUBTRACTED_DATA", masked_source_list)
+        run_dp3_subtract(final_ms, masked_source_list)
+
+    # step 9: phaseshift to sun and average, in one DP3 pass; without
+    # averaging wsclean can shift on the fly and no MS needs writing
+    if shift_in_wsclean:
+        final_img_ms = final_ms
+        final_img_args = f" -data-column SUBTRACTED_DATA -shift {sun_ra}deg {sun_dec}deg "
+    else:
+        shifted_ms_avg = data_dir / f"{output_prefix}_image_source_sun_shifted_avg.ms"
+        if fuse_subtract:
+            print(f"Subtracting sources and phaseshifting to sun from {final_ms} to {shifted_ms_avg}")
+            phaseshift_to_sun(final_ms, shifted_ms_avg, sun_radec=(sun_ra, sun_dec), datacolumn="DATA",
+                freq_step=final_freq_step if final_freq_step > 1 else None,
+                subtract_sourcedb=masked_source_list)
+        else:
+            print(f"Phaseshifting to sun from {final_ms} SUBTRACTED_DATA to {shifted_ms_avg}")
+            phaseshift_to_sun(final_ms, shifted_ms_avg, sun_radec=(sun_ra, sun_dec), datacolumn="SUBTRACTED_DATA",
+                freq_step=final_freq_step if final_freq_step > 1 else None)
+        if rm_ms_tmp and not DEBUG:
+            shutil.rmtree(final_ms)
+        final_img_ms = shifted_ms_avg
+        final_img_args = ""
 
     # final image
-#    run_wsclean_imaging(shifted_ms, str(data_dir / f"{output_prefix}_image_source_sun_shifted"), auto_pix_fov=False, 
+#    run_wsclean_imaging(shifted_ms_avg, str(data_dir / f"{output_prefix}_image_source_sun_shifted"), auto_pix_fov=False, 
 #        niter=3000, mgain=0.8, size=512, scale='1.5arcmin', save_source_list=False, weight='briggs -0.5')
-    shifted_ms_avg = data_dir / f"{output_prefix}_image_source_sun_shifted_avg.ms"
-    run_dp3_avg(shifted_ms, shifted_ms_avg, freq_step=4)
     
     # make a copy
     # shifted_ms_avg_copy = data_dir / f"{output_prefix}_image_source_sun_shifted_avg_copy.ms"
@@ -362,31 +589,35 @@ def run_calib_pipeline(raw_ms, gaintable, output_prefix="proc", plot_mid_steps=F
     print(f"Pipeline completed successfully! (Total time: {total_elapsed:.1f}s)")
     print("="*60)
 
-    default_wscleancmd = "wsclean -j 8 -mem 6 -quiet -no-dirty -no-update-model-required \
+    # The final images (and the DEBUG image of the subtracted data) are
+    # independent wsclean runs: run them concurrently, sharing the threads
+    final_names = [name for name, wanted in (("fch", fch_img), ("mfs", mfs_img)) if wanted]
+    n_jobs = len(final_names) + (1 if DEBUG else 0)
+    job_threads = max(1, N_THREADS // max(1, n_jobs))
+    default_wscleancmd = f"wsclean -j {job_threads} -mem 6 -quiet -no-dirty -no-update-model-required \
         -horizon-mask 5deg -size 512 512 -scale 1.5arcmin -weight briggs -0.5 -minuv-l 10 \
         -auto-threshold 3  -niter 6000 -mgain 0.9 -beam-fitting-size 2 -pol I "
-    import shlex
-
-    if fch_img:
-        time_start = time.time()
-        wscleancmd = default_wscleancmd + " -join-channels -channels-out 12 -name " + f"{output_prefix}_fch " + str(shifted_ms_avg)
-        subprocess.run(shlex.split(wscleancmd), check=True, capture_output=True, text=True)
-        total_elapsed = time.time() - time_start
-        print(f"✓ WSClean imaging completed ({total_elapsed:.1f}s): {output_prefix}_fch*.fits")
-
-    if mfs_img:
-        time_start = time.time()
-        wscleancmd = default_wscleancmd + " -name " + f"{output_prefix}_mfs " + str(shifted_ms_avg)
-        subprocess.run(shlex.split(wscleancmd), check=True, capture_output=True, text=True)
-        total_elapsed = time.time() - time_start
-        print(f"✓ WSClean imaging completed ({total_elapsed:.1f}s): {output_prefix}_mfs*.fits")
+    final_extra_args = {"fch": " -join-channels -channels-out 12", "mfs": ""}
+
+    with ThreadPoolExecutor(max_workers=max(1, n_jobs)) as executor:
+        futures = [executor.submit(run_final_wsclean,
+                default_wscleancmd + final_img_args + final_extra_args[name]
+                + f" -name {output_prefix}_{name} " + str(final_img_ms),
+                f"{output_prefix}_{name}")
+            for name in final_names]
+        if DEBUG:
+            futures.append(executor.submit(run_wsclean_imaging, final_ms,
+                str(data_dir / f"{output_prefix}_image_source_masked_subtracted"), niter=5000, mgain=0.9,horizon_mask=0.1,
+                data_column="SUBTRACTED_DATA", j=job_threads, freq=ms_freq))
+        for future in futures:
+            future.result()
 
-    if DEBUG:
-        run_wsclean_imaging(subtracted_ms, str(data_dir / f"{output_prefix}_image_source_masked_subtracted"), niter=5000, mgain=0.9,horizon_mask=0.1)
+    if shift_in_wsclean and rm_ms_tmp and not DEBUG:
+        shutil.rmtree(final_ms)
 
     if plot_mid_steps:
         from script.plot_fits import plot_fits
-        plot_fits(data_dir / f"{output_prefix}_image-image.fits")
+        plot_fits(data_dir / f"{output_prefix}_image-MFS-image.fits")
         plot_fits(data_dir / f"{output_prefix}_image_source-image.fits")
         plot_fits(data_dir / f"{output_prefix}_image_source_sun_shifted-image.fits")
         if DEBUG:
@@ -396,7 +627,82 @@ def run_calib_pipeline(raw_ms, gaintable, output_prefix="proc", plot_mid_steps=F
 
 
 
+def run_final_wsclean(wscleancmd, name):
+    """
+    Run one final-image wsclean command line
+
+    Each run reorders into its own scratch directory, so concurrent runs
+    on the same MS do not collide on wsclean's temporary files.
+    """
+    time_start = time.time()
+    temp_dir = tempfile.mkdtemp(prefix="wsclean_", dir=tempfile.gettempdir())
+    try:
+        run_streaming(["wsclean", "-temp-dir", temp_dir, *shlex.split(wscleancmd)[1:]],
+                       tail_lines=50, echo=False)
+    except subprocess.CalledProcessError as e:
+        total_elapsed = time.time() - time_start
+        print(f"✗ WSClean imaging failed after {total_elapsed:.1f}s, last wsclean output:\n{e.output}")
+        sys.exit(1)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    total_elapsed = time.time() - time_start
+    print(f"✓ WSClean imaging completed ({total_elapsed:.1f}s): {name}*.fits")
+
+@lru_cache(maxsize=None)
+def wsclean_supports_shift():
+    """
+    Whether the installed wsclean can shift the phase centre while imaging (-shift)
+
+    Looks for a -shift option line in the help text, which some builds
+    print to stderr; cached, so wsclean --help runs once per process.
+    """
+    try:
+        result = subprocess.run(["wsclean", "--help"], capture_output=True, text=True)
+    except FileNotFoundError:
+        return False
+    return re.search(r"^\s*-shift\b", result.stdout + result.stderr, re.MULTILINE) is not None
+
+def _set_threads(n_threads):
+    """Pool worker initializer: thread count for this worker's DP3/wsclean runs"""
+    global N_THREADS
+    N_THREADS = n_threads
+
+def run_pipeline_batch(raw_ms_list, gaintable, max_workers=None, **kwargs):
+    """
+    Run the pipeline on several MS, with one CASA applycal session for all
+    
+    The CASA step (whose import alone takes seconds) runs once for the whole
+    batch, skipping any MS whose flagged/averaged MS is already current; the
+    remaining steps then run per MS in a process pool, with the CPUs split
+    between the workers.
+    
+    Args:
+        raw_ms_list: Input raw measurement sets
+        gaintable: Bandpass calibration table, or a list with one per MS
+        max_workers: Concurrent pipelines (default: one per MS, at most the CPU count)
+        **kwargs: Passed on to run_calib_pipeline
+    """
+    gaintables = [gaintable] * len(raw_ms_list) if isinstance(gaintable, (str, Path)) else list(gaintable)
+    casa_jobs = [(raw_ms, applied_bp_ms_path(raw_ms), gt)
+                 for raw_ms, gt in zip(raw_ms_list, gaintables)
+                 if not run_flag_avg_steps.is_current(Path(raw_ms), flagged_avg_ms_path(raw_ms), gt,
+                                                      STRATEGY_FILE, bp_applied=True)]
+    if casa_jobs:
+        run_casa_applycal_batch(casa_jobs)
+    
+    if max_workers is None:
+        max_workers = min(len(raw_ms_list), N_THREADS)
+    max_workers = max(1, max_workers)
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_set_threads,
+                             initargs=(max(1, N_THREADS // max_workers),)) as executor:
+        futures = [executor.submit(run_calib_pipeline, raw_ms, gt, Path(raw_ms).stem.split('.')[0],
+                                   bp_applied=True, **kwargs)
+                   for raw_ms, gt in zip(raw_ms_list, gaintables)]
+        for future in futures:
+            future.result()
+
 def main():
+    global N_THREADS
     parser = argparse.ArgumentParser(
         description="LWA Quick Processing Pipeline: raw MS -> CASA applycal -> DP3 flag/avg -> wsclean -> gaincal -> applycal",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter
@@ -417,9 +723,16 @@ def main():
                         help="Generate per-channel images")
     parser.add_argument("--mfs-img", action="store_true", default=False,
                         help="Generate multi-frequency synthesis image")
+    parser.add_argument("--final-freq-step", type=int, default=4,
+                        help="Channels averaged for the final images; with 1, wsclean shifts "
+                             "to the Sun itself (if it supports -shift) and no shifted MS is written")
+    parser.add_argument("--threads", type=int, default=N_THREADS,
+                        help="Threads for DP3 and wsclean (default: CPUs available to this process)")
     
     args = parser.parse_args()
     
+    N_THREADS = args.threads
+    
     # Validate inputs
     if not Path(args.raw_ms).exists():
         print(f"Error: Raw MS not found: {args.raw_ms}")
@@ -436,7 +749,7 @@ def main():
     # Run the pipeline
     run_calib_pipeline( args.raw_ms,  args.gaintable,  args.output_prefix, 
         plot_mid_steps=False,  rm_ms_tmp=not args.keep_ms_tmp,  DEBUG=False,  
-        fch_img=args.fch_img,  mfs_img=args.mfs_img)
+        fch_img=args.fch_img,  mfs_img=args.mfs_img,  final_freq_step=args.final_freq_step)
 
 if __name__ == "__main__":
     main()
@@ -1,4 +1,6 @@
 #!/usr/bin/env python3
+import matplotlib
+matplotlib.use("Agg")  # headless backend, PNG output only
 import matplotlib.pyplot as plt
 import numpy as np
 from astropy.io import fits
@@ -0,0 +1,26 @@
+"""
+Page-cache prefetch helper shared by the pipeline and the plotting scripts
+"""
+import os
+
+def fadvise_willneed(paths):
+    """
+    Ask the kernel to start reading the given files into the page cache
+
+    POSIX_FADV_WILLNEED queues asynchronous readahead and returns at once.
+    Files that cannot be opened are skipped; a no-op where posix_fadvise
+    is not available.
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
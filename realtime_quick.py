@@ -1,10 +1,59 @@
 import os, shutil, time, subprocess
+import atexit
 import config
 import uuid
 import glob
 
 from plot_solar_image import plot_solar_image
 
+PIPEHOST_IMAGE = "peijin/lwa-solar-pipehost:v202510"
+WORKER_NAME = "lwa_worker"
+
+
+def start_worker_container(proc_root, name=WORKER_NAME):
+    """
+    Start a long-lived pipeline container that each run is exec'ed in
+    
+    proc_root is mounted at the same path inside the container, so the
+    per-run proc_dir paths are valid on both sides. The container is
+    created once and kept (no --rm): later starts of this script, or
+    restarts after it exited, only need a podman start. The caller
+    registers stop_worker_container to stop (not remove) it on exit.
+    
+    Args:
+        proc_root: Directory holding the per-run processing directories
+        name: Container name
+    
+    Returns:
+        The container name
+    """
+    if subprocess.run(["podman", "container", "exists", name]).returncode != 0:
+        subprocess.run(["podman", "create", "--name", name,
+                        "-v", "/fast/peijinz/agile_proc/lwa-quick-proc-image:/lwasoft:ro",
+                        "-v", f"{proc_root}:{proc_root}:rw",
+                        # host tmpfs for wsclean scratch (podman's own is 64 MB)
+                        "-v", "/dev/shm:/dev/shm",
+                        PIPEHOST_IMAGE, "sleep", "infinity"],
+                       check=True, capture_output=True)
+    # No-op if it is already running
+    subprocess.run(["podman", "start", name], check=True, capture_output=True)
+    return name
+
+
+def stop_worker_container(name=WORKER_NAME):
+    """Stop the worker container, keeping it for the next start"""
+    subprocess.run(["podman", "stop", "-t", "0", name], capture_output=True)
+
+
+def ensure_worker_container(proc_root, name=WORKER_NAME):
+    """Restart the worker container if it has exited"""
+    state = subprocess.run(["podman", "container", "inspect", "-f", "{{.State.Running}}", name],
+                           capture_output=True, text=True)
+    if state.stdout.strip() != "true":
+        print("worker container not running, starting", name)
+        start_worker_container(proc_root, name)
+    return name
+
 
 def get_newest_file(data_dir="/lustre/pipeline/slow/69MHz"):
     """
@@ -66,6 +115,10 @@ def get_caltable_by_freqname(caltable_dir, freq="69MHz"):
 if __name__ == "__main__":
 
     print("realtime_quick.py started")
+    # One container for all runs: each run is a podman exec, not a
+    # container start/stop
+    worker = start_worker_container(config.proc_root)
+    atexit.register(stop_worker_container, worker)
     while True:
         try:
         # prepare data and caltable
@@ -94,14 +147,11 @@ if __name__ == "__main__":
 
         try:
         # run the pipeline
-            run_cmd = f"""podman run --rm -it \
-                -v /fast/peijinz/agile_proc/lwa-quick-proc-image:/lwasoft:ro \
-                -v {proc_dir}:/data:rw \
-                -w /data \
-                peijin/lwa-solar-pipehost:v202510 \
+            worker = ensure_worker_container(config.proc_root, worker)
+            run_cmd = f"""podman exec -w {proc_dir} {worker} \
                 python3 /lwasoft/pipeline_quick_proc_img.py \
-                /data/slow/{os.path.basename(fname_to_proc)} \
-                /data/caltable/{os.path.basename(caltable_file)} --mfs-img \
+                {proc_dir}/slow/{os.path.basename(fname_to_proc)} \
+                {proc_dir}/caltable/{os.path.basename(caltable_file)} --mfs-img \
                 > {proc_dir}/proc.log"""
 
             start_time = time.time()
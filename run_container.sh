@@ -1,11 +1,22 @@
 #!/bin/bash
 # Run LWA solar pipeline in container
 
-podman run --rm -it \
-  -v /fast/peijinz/agile_proc/lwa-quick-proc-image:/lwasoft:ro \
-  -v /fast/peijinz/agile_proc/testdata_v2:/data:rw \
-  -w /data \
-  peijin/lwa-solar-pipehost:v202510 \
+# Persistent container, created once (no --rm) and only stopped at the
+# end, so repeated runs just podman start it and exec the pipeline
+WORKER="lwa_pipe"
+if ! podman container exists "$WORKER"; then
+  podman create --name "$WORKER" \
+    -v /fast/peijinz/agile_proc/lwa-quick-proc-image:/lwasoft:ro \
+    -v /fast/peijinz/agile_proc/testdata_v2:/data:rw \
+    -v /dev/shm:/dev/shm \
+    -w /data \
+    peijin/lwa-solar-pipehost:v202510 \
+    sleep infinity > /dev/null
+fi
+podman start "$WORKER" > /dev/null
+trap 'podman stop -t 0 "$WORKER" > /dev/null' EXIT
+
+podman exec -w /data "$WORKER" \
   python3 /lwasoft/pipeline_quick_proc_img.py \
     /data/slow/20250917_200002_73MHz.ms \
     /data/caltables/20250814_064505_73MHz.bcal \
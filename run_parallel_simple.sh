@@ -7,23 +7,50 @@ DATA_DIR="/fast/peijinz/agile_proc/testdata_v4"
 SLOW_DIR="${DATA_DIR}/slow"
 CALTABLE_DIR="${DATA_DIR}/caltables"
 
+# Number of MS files processed at once; each job gets its own block of
+# CORES_PER_JOB cores (contiguous, so it normally stays on one NUMA node)
+N_JOBS=12
+CORES_PER_JOB=$(( $(nproc) / N_JOBS ))
+
 # Create logs directory
 mkdir -p "${DATA_DIR}/logs"
 
+# One persistent worker container per job slot, pinned to the slot's core
+# block. Created once (no --rm) and only stopped at the end, so later runs
+# just podman start them; each MS is a podman exec into its slot's worker
+for slot in $(seq 1 ${N_JOBS}); do
+    worker="lwa_persist_${slot}"
+    if ! podman container exists "$worker"; then
+        cpuset_args=()
+        if [ "$CORES_PER_JOB" -gt 0 ]; then
+            first_cpu=$(( (slot - 1) * CORES_PER_JOB ))
+            cpuset_args=(--cpuset-cpus="${first_cpu}-$(( first_cpu + CORES_PER_JOB - 1 ))")
+        fi
+        podman create --name "$worker" "${cpuset_args[@]}" \
+            -v /fast/peijinz/agile_proc/lwa-quick-proc-image:/lwasoft:ro \
+            -v /fast/peijinz/agile_proc/testdata_v4:/data:rw \
+            -v /dev/shm:/dev/shm \
+            -w /data \
+            peijin/lwa-solar-pipehost:v202510 \
+            sleep infinity > /dev/null
+    fi
+    podman start "$worker" > /dev/null
+done
+trap 'podman stop -t 0 $(seq -f "lwa_persist_%g" 1 ${N_JOBS}) > /dev/null' EXIT
+
 # Create a function that parallel can call
 process_ms() {
     local ms_file="$1"
+    local slot="$2"
     local freq=$(echo "$ms_file" | grep -o '[0-9]\+MHz' | head -1)
     local base_name=$(basename "$ms_file" .ms)
     local start_time=$(date +%s)
     
     echo "Processing $ms_file (${freq})..."
     
-    podman run --rm \
-        -v /fast/peijinz/agile_proc/lwa-quick-proc-image:/lwasoft:ro \
-        -v /fast/peijinz/agile_proc/testdata_v4:/data:rw \
-        -w /data \
-        peijin/lwa-solar-pipehost:v202510 \
+    # Run in this slot's worker, which is pinned to the slot's core block;
+    # DP3/wsclean size their thread pools from the CPUs they can see
+    podman exec -w /data "lwa_persist_${slot}" \
         python3 /lwasoft/pipeline_quick_proc_img.py \
             "/data/slow/$ms_file" \
             "/data/caltables/20250920_041508_${freq}.bcal" \
@@ -48,7 +75,7 @@ SCRIPT_START_TIME=$(date +%s)
 
 # Get list of MS files and run in parallel
 ls "${SLOW_DIR}" | grep "\.ms$" | \
-parallel -j 12 --progress --line-buffer process_ms {}
+parallel -j ${N_JOBS} --progress --line-buffer process_ms {} {%}
 
 # Calculate total execution time
 SCRIPT_END_TIME=$(date +%s)
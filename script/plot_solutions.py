@@ -5,12 +5,269 @@ Visualizes amplitude and phase solutions for each antenna
 """
 
 import sys
+import warnings
 import numpy as np
+import matplotlib
+matplotlib.use("Agg")  # headless backend, PNG output only
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
 from pathlib import Path
 import argparse
 
-def plot_solutions(solution_file, output_dir=None, antennas=None):
+# Simplify dense polylines as far as possible while rasterizing
+matplotlib.rcParams['path.simplify_threshold'] = 1.0
+
+# Candidate dataset paths in DP3 solution files, in order of preference
+_SOLTAB_PREFIXES = (
+    'sol000/phase000/',
+    'sol000/amplitude000/',
+    'sol000/gain000/',
+    'phase000/',
+    'amplitude000/',
+    'gain000/',
+    '',
+)
+_VAL_CANDIDATES = tuple(prefix + 'val' for prefix in _SOLTAB_PREFIXES)
+_AXIS_CANDIDATES = tuple(prefix + 'axis' for prefix in _SOLTAB_PREFIXES)
+_ANT_CANDIDATES = tuple(prefix + 'ant' for prefix in _SOLTAB_PREFIXES)
+_TIME_CANDIDATES = tuple(prefix + 'time' for prefix in _SOLTAB_PREFIXES)
+
+def _first_existing(names, candidates):
+    """Return the first candidate path in the set of object names, or None"""
+    for path in candidates:
+        if path in names:
+            return path
+    return None
+
+def _read_gains(dset):
+    """
+    Read a solution value dataset, restricted to what gets plotted
+    
+    For [time, freq, antenna, pol] cubes only the first frequency channel is
+    plotted, so only that hyperslab is read from disk (freq axis kept, length 1).
+    """
+    if dset.ndim == 4:
+        return dset[:, 0:1, :, :]
+    return _read_dataset(dset)
+
+def _read_dataset(dset):
+    """Read a whole HDF5 dataset with a single low-level H5Dread"""
+    if dset.dtype.kind == 'O' or dset.shape == ():
+        # Variable-length/scalar data: let the high-level API handle conversion
+        return dset[()]
+    from h5py import h5s
+    out = np.empty(dset.shape, dtype=dset.dtype)
+    dset.id.read(h5s.ALL, h5s.ALL, out)
+    return out
+
+def _combine_gains(amplitude, phase):
+    """
+    Build complex64 gains amplitude * exp(1j * phase)
+    
+    Inputs are cast to float32 (plenty for plotting). Uses numexpr when
+    installed, otherwise writes cos/sin straight into the output buffer to
+    avoid full-size complex temporaries.
+    """
+    amplitude = amplitude.astype(np.float32, copy=False)
+    phase = phase.astype(np.float32, copy=False)
+    
+    try:
+        import numexpr as ne
+    except ImportError:
+        ne = None
+    
+    if ne is not None:
+        gains = ne.evaluate("complex(amplitude * cos(phase), amplitude * sin(phase))")
+        return gains.astype(np.complex64, copy=False)
+    
+    gains = np.empty(np.broadcast(amplitude, phase).shape, dtype=np.complex64)
+    np.cos(phase, out=gains.real)
+    np.sin(phase, out=gains.imag)
+    gains *= amplitude
+    return gains
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+if njit is not None:
+    @njit(parallel=True, cache=True)
+    def _nan_stats_kernel(flat):
+        """Min, max (ignoring NaN) and NaN count of a 1-D array in one parallel pass"""
+        n = flat.size
+        nchunks = 64
+        step = (n + nchunks - 1) // nchunks
+        los = np.full(nchunks, np.inf)
+        his = np.full(nchunks, -np.inf)
+        nans = np.zeros(nchunks, dtype=np.int64)
+        for c in prange(nchunks):
+            lo = np.inf
+            hi = -np.inf
+            count = 0
+            for i in range(c * step, min(n, (c + 1) * step)):
+                v = flat[i]
+                if v != v:
+                    count += 1
+                else:
+                    if v < lo:
+                        lo = v
+                    if v > hi:
+                        hi = v
+            los[c] = lo
+            his[c] = hi
+            nans[c] = count
+        return los.min(), his.max(), nans.sum()
+
+def _nan_stats(a):
+    """
+    Return (min, max, nan_count) of a real array, ignoring NaN in min/max
+    
+    Uses a single fused pass when numba is installed. Min/max are NaN if
+    every value is NaN.
+    """
+    if njit is not None:
+        # ravel in memory order: no copy for transposed views
+        lo, hi, nan_count = _nan_stats_kernel(np.ravel(a, order='K'))
+    else:
+        nan_count = np.count_nonzero(np.isnan(a))
+        lo, hi = (np.nanmin(a), np.nanmax(a)) if nan_count < a.size else (np.inf, -np.inf)
+    if nan_count == a.size:
+        lo = hi = np.nan
+    return lo, hi, int(nan_count)
+
+def _wrap_phase(phase):
+    """Wrap phases to [-pi, pi), as np.angle of the combined gains would"""
+    return np.mod(phase + np.pi, 2 * np.pi) - np.pi
+
+def _dataset_stats(dset, transform=None, slab_bytes=64 * 1024**2):
+    """
+    Return (min, max, nan_count, size) over a whole solution dataset
+    
+    Only the first channel is read for plotting, but the reported statistics
+    cover every channel: the dataset is read in slabs along its first (time)
+    axis so memory stays bounded. transform (e.g. np.abs) is applied to each
+    slab first.
+    """
+    if dset.ndim == 0:
+        slabs = [np.asarray(dset[()])]
+    else:
+        row_bytes = max(1, dset.dtype.itemsize * (dset.size // max(1, dset.shape[0])))
+        step = max(1, slab_bytes // row_bytes)
+        slabs = (dset[i:i + step] for i in range(0, dset.shape[0], step))
+    lo, hi, nan_count = np.inf, -np.inf, 0
+    for slab in slabs:
+        if transform is not None:
+            slab = transform(slab)
+        slab_lo, slab_hi, slab_nans = _nan_stats(slab)
+        # fmin/fmax skip the NaN bounds of all-NaN slabs
+        lo, hi = np.fmin(lo, slab_lo), np.fmax(hi, slab_hi)
+        nan_count += slab_nans
+    if nan_count == dset.size:
+        lo = hi = np.nan
+    return lo, hi, nan_count, dset.size
+
+# Line plots with more time steps than this are LTTB-downsampled (if available)
+LTTB_THRESHOLD = 2000
+LTTB_POINTS = 1000
+
+def _downsample_lttb(time_vals, values, n_out=LTTB_POINTS):
+    """
+    Reduce one time series to n_out visually representative points with LTTB
+    
+    Returns an [n, 2] (time, value) array, or None if the optional lttb
+    package is missing or the series is short enough to plot as is.
+    NaN (flagged) samples are dropped before downsampling.
+    """
+    try:
+        import lttb
+    except ImportError:
+        return None
+    good = np.isfinite(values)
+    if good.sum() <= n_out:
+        return None
+    return lttb.downsample(np.column_stack([time_vals[good], values[good]]), n_out=n_out)
+
+def _bin_time(values, factor, circular=False):
+    """
+    Average [n_time, n_ant] values over blocks of factor time steps
+    
+    circular=True averages angles (radians) on the unit circle so phase
+    wraps do not smear.
+    """
+    if factor < 2:
+        return values
+    n = values.shape[0] // factor * factor
+    blocks = values[:n].reshape(n // factor, factor, *values.shape[1:])
+    with warnings.catch_warnings():
+        # Fully flagged blocks legitimately give NaN
+        warnings.simplefilter('ignore', RuntimeWarning)
+        if circular:
+            return np.angle(np.nanmean(np.exp(1j * blocks), axis=1))
+        return np.nanmean(blocks, axis=1)
+
+def _summary_panel(values, bin_factor, phase=False):
+    """
+    Build an [n_ant, n_time] imshow panel as a C-contiguous float32 array
+    
+    phase=True treats values as radians: binned on the unit circle and
+    converted to degrees in place.
+    """
+    panel = np.ascontiguousarray(_bin_time(values, bin_factor, circular=phase).T,
+                                 dtype=np.float32)
+    if phase:
+        np.multiply(panel, np.float32(180 / np.pi), out=panel)
+    return panel
+
+def _adjust_layout(fig, nrows):
+    """Fixed margins for the 1x2 / 2x2 panel grids, so savefig renders only once"""
+    if nrows == 2:
+        fig.subplots_adjust(left=0.06, right=0.97, bottom=0.06, top=0.92,
+                            wspace=0.25, hspace=0.3)
+    else:
+        fig.subplots_adjust(left=0.06, right=0.97, bottom=0.12, top=0.85,
+                            wspace=0.25)
+
+def _plot_antenna_lines(ax, time_vals, series, plotted_antennas, antenna_names, legend=False):
+    """
+    Draw one line per plotted antenna as a single LineCollection
+    
+    Args:
+        ax: Axes to draw on
+        time_vals: Time axis values [n_time]
+        series: Values to plot [n_time, n_ant]
+        plotted_antennas: Antenna indices to draw
+        antenna_names: Antenna names (optional, used for the legend)
+        legend: Add a legend with one entry per antenna
+    """
+    sel = np.asarray(series)[:, plotted_antennas].T
+    
+    segments = None
+    if sel.shape[1] > LTTB_THRESHOLD:
+        # Long series: far more points than pixels, downsample each antenna
+        time_vals = np.asarray(time_vals)
+        downsampled = [_downsample_lttb(time_vals, values) for values in sel]
+        if all(d is not None for d in downsampled):
+            segments = downsampled
+    if segments is None:
+        segments = np.ma.masked_invalid(
+            np.stack([np.broadcast_to(time_vals, sel.shape), sel], axis=-1))
+    
+    cycle = plt.rcParams['axes.prop_cycle'].by_key()['color']
+    colors = [cycle[i % len(cycle)] for i in range(len(plotted_antennas))]
+    
+    lc = LineCollection(segments, colors=colors, alpha=0.7, rasterized=True)
+    ax.add_collection(lc)
+    ax.autoscale_view()
+    
+    if legend:
+        handles = [Line2D([], [], color=color, alpha=0.7,
+                          label=antenna_names[ant_idx] if antenna_names is not None else f"Ant{ant_idx}")
+                   for ant_idx, color in zip(plotted_antennas, colors)]
+        ax.legend(handles=handles)
+
+def plot_solutions(solution_file, output_dir=None, antennas=None, verbose=False):
     """
     Plot gain solutions from DP3 solution.h5 file
     
@@ -18,6 +275,7 @@ def plot_solutions(solution_file, output_dir=None, antennas=None):
         solution_file: Path to solution.h5 file
         output_dir: Directory to save plots (optional)
         antennas: List of antenna indices to plot (optional, plots all if None)
+        verbose: Print the full HDF5 file structure (optional)
     """
     
     try:
@@ -42,85 +300,89 @@ def plot_solutions(solution_file, output_dir=None, antennas=None):
     
     try:
         with h5py.File(solution_file, 'r') as h5f:
-            # Print file structure for debugging
-            print("Solution file structure:")
-            def print_structure(name, obj):
-                print(f"  {name}: {type(obj)}")
-                if hasattr(obj, 'shape'):
-                    print(f"    Shape: {obj.shape}")
-                if hasattr(obj, 'dtype'):
-                    print(f"    Type: {obj.dtype}")
-            
-            h5f.visititems(print_structure)
+            if verbose:
+                # Print file structure for debugging (walks every object)
+                print("Solution file structure:")
+                def print_structure(name, obj):
+                    print(f"  {name}: {type(obj)}")
+                    if hasattr(obj, 'shape'):
+                        print(f"    Shape: {obj.shape}")
+                    if hasattr(obj, 'dtype'):
+                        print(f"    Type: {obj.dtype}")
+                
+                h5f.visititems(print_structure)
             
-            # Try to find gain solutions - common paths in DP3 solution files
-            possible_paths = [
-                'sol000/phase000/val',
-                'sol000/amplitude000/val', 
-                'sol000/gain000/val',
-                'phase000/val',
-                'amplitude000/val',
-                'gain000/val',
-                'val'
-            ]
+            # Collect every object name in one walk of the file; candidate
+            # lookups below are then plain set membership tests
+            names = set()
+            h5f.visit(names.add)
             
-            # Find axes information
-            possible_axis_paths = [
-                'sol000/phase000/axis',
-                'sol000/amplitude000/axis',
-                'sol000/gain000/axis',
-                'phase000/axis',
-                'amplitude000/axis', 
-                'gain000/axis',
-                'axis'
-            ]
+            # Locate every dataset by name only; nothing is read yet
+            phase_path = 'sol000/phase000/val' if 'sol000/phase000/val' in names else None
+            amplitude_path = 'sol000/amplitude000/val' if 'sol000/amplitude000/val' in names else None
+            val_path = _first_existing(names, _VAL_CANDIDATES)
+            axis_path = _first_existing(names, _AXIS_CANDIDATES)
+            ant_path = _first_existing(names, _ANT_CANDIDATES)
+            time_path = _first_existing(names, _TIME_CANDIDATES)
             
             gains = None
             axes_info = None
             solution_type = None
+            # Full-cube (min, max, nan_count, size) for the printed statistics
+            amp_stats = phase_stats = val_stats = None
             
             # Try to find gain data - check both amplitude and phase
             phase_gains = None
             amplitude_gains = None
             
-            if 'sol000/phase000/val' in h5f:
-                phase_gains = h5f['sol000/phase000/val'][:]
-                print(f"Found phase solutions: {phase_gains.shape}")
+            if phase_path is not None:
+                phase_gains = _read_gains(h5f[phase_path])
+                if verbose:
+                    print(f"Found phase solutions: {phase_gains.shape}")
             
-            if 'sol000/amplitude000/val' in h5f:
-                amplitude_gains = h5f['sol000/amplitude000/val'][:]
-                print(f"Found amplitude solutions: {amplitude_gains.shape}")
+            if amplitude_path is not None:
+                amplitude_gains = _read_gains(h5f[amplitude_path])
+                if verbose:
+                    print(f"Found amplitude solutions: {amplitude_gains.shape}")
             
             # Prefer complex gains if both are available
             if phase_gains is not None and amplitude_gains is not None:
-                gains = amplitude_gains * np.exp(1j * phase_gains)
+                gains = _combine_gains(amplitude_gains, phase_gains)
                 solution_type = "complex_gain"
-                print(f"Combined complex gains: {gains.shape}")
+                amp_stats = _dataset_stats(h5f[amplitude_path], np.abs)
+                phase_stats = _dataset_stats(h5f[phase_path], _wrap_phase)
+                if verbose:
+                    print(f"Combined complex gains: {gains.shape}")
             elif phase_gains is not None:
                 gains = phase_gains
                 solution_type = "phase"
-                print(f"Using phase solutions: {gains.shape}")
+                val_stats = _dataset_stats(h5f[phase_path])
+                if verbose:
+                    print(f"Using phase solutions: {gains.shape}")
             elif amplitude_gains is not None:
                 gains = amplitude_gains
                 solution_type = "amplitude"
-                print(f"Using amplitude solutions: {gains.shape}")
-            else:
+                val_stats = _dataset_stats(h5f[amplitude_path])
+                if verbose:
+                    print(f"Using amplitude solutions: {gains.shape}")
+            elif val_path is not None:
                 # Fall back to original search
-                for path in possible_paths:
-                    if path in h5f:
-                        gains = h5f[path][:]
-                        solution_type = path.split('/')[-2] if '/' in path else 'unknown'
-                        print(f"Found solutions at: {path}")
-                        print(f"Solution shape: {gains.shape}")
-                        print(f"Solution type: {solution_type}")
-                        break
+                gains = _read_gains(h5f[val_path])
+                solution_type = val_path.split('/')[-2] if '/' in val_path else 'unknown'
+                if np.iscomplexobj(gains):
+                    amp_stats = _dataset_stats(h5f[val_path], np.abs)
+                    phase_stats = _dataset_stats(h5f[val_path], np.angle)
+                else:
+                    val_stats = _dataset_stats(h5f[val_path])
+                if verbose:
+                    print(f"Found solutions at: {val_path}")
+                    print(f"Solution shape: {gains.shape}")
+                    print(f"Solution type: {solution_type}")
             
-            # Try to find axes information
-            for path in possible_axis_paths:
-                if path in h5f:
-                    axes_info = h5f[path][:]
-                    print(f"Found axes at: {path}")
-                    break
+            # Axes information is only reported, so only read it when verbose
+            if verbose and axis_path is not None:
+                axes_info = h5f[axis_path][()]
+                print(f"Found axes at: {axis_path}")
             
             if gains is None:
                 print("Error: Could not find gain solutions in file")
@@ -131,56 +393,43 @@ def plot_solutions(solution_file, output_dir=None, antennas=None):
             
             # Get antenna names if available
             antenna_names = None
-            possible_ant_paths = [
-                'sol000/phase000/ant',
-                'sol000/amplitude000/ant',
-                'sol000/gain000/ant',
-                'phase000/ant',
-                'amplitude000/ant',
-                'gain000/ant',
-                'ant'
-            ]
-            
-            for path in possible_ant_paths:
-                if path in h5f:
-                    antenna_names = h5f[path][:]
-                    if isinstance(antenna_names[0], bytes):
-                        antenna_names = [name.decode() for name in antenna_names]
+            if ant_path is not None:
+                antenna_names = _read_dataset(h5f[ant_path])
+                # Decode byte strings in one C loop, keeping a numpy array
+                if antenna_names.dtype.kind == 'O' and isinstance(antenna_names[0], bytes):
+                    antenna_names = antenna_names.astype('S')  # variable-length strings
+                if antenna_names.dtype.kind == 'S':
+                    antenna_names = np.char.decode(antenna_names, 'utf-8')
+                if verbose:
                     print(f"Found antenna names: {antenna_names[:5]}...")
-                    break
             
             # Get time information if available
             times = None
-            possible_time_paths = [
-                'sol000/phase000/time',
-                'sol000/amplitude000/time', 
-                'sol000/gain000/time',
-                'phase000/time',
-                'amplitude000/time',
-                'gain000/time',
-                'time'
-            ]
-            
-            for path in possible_time_paths:
-                if path in h5f:
-                    times = h5f[path][:]
+            if time_path is not None:
+                times = _read_dataset(h5f[time_path])
+                if verbose:
                     print(f"Found times: {len(times)} timesteps")
-                    break
     
     except Exception as e:
         print(f"Error reading solution file: {e}")
         return
     
     # Determine data dimensions
-    print(f"Gain array shape: {gains.shape}")
+    if verbose:
+        print(f"Gain array shape: {gains.shape}")
     
     # DP3 H5Parm format is typically [time, freq, antenna, pol]
-    if len(gains.shape) == 4:
+    if gains.ndim == 4:
         n_time, n_freq, n_ant, n_pol = gains.shape
-        # Transpose to [time, antenna, freq, pol] for easier plotting
-        gains = gains.transpose(0, 2, 1, 3)
+        # Reorder to [time, antenna, freq, pol] for easier plotting. With the
+        # single channel read by _read_gains this is a free reshape, and the
+        # result stays C-contiguous for the plotting and statistics below.
+        if n_freq == 1:
+            gains = gains.reshape(n_time, n_ant, 1, n_pol)
+        else:
+            gains = np.ascontiguousarray(gains.transpose(0, 2, 1, 3))
         time_axis = True
-    elif len(gains.shape) == 3:
+    elif gains.ndim == 3:
         if gains.shape[1] == 1:  # [time, freq, antenna] - single pol
             n_time, n_freq, n_ant = gains.shape
             n_pol = 1
@@ -191,7 +440,7 @@ def plot_solutions(solution_file, output_dir=None, antennas=None):
             n_time = 1
             gains = gains.reshape(1, n_ant, n_freq, n_pol)
             time_axis = False
-    elif len(gains.shape) == 2:
+    elif gains.ndim == 2:
         # [antenna, pol] - single time and frequency
         n_ant, n_pol = gains.shape
         n_time = n_freq = 1
@@ -212,6 +461,9 @@ def plot_solutions(solution_file, output_dir=None, antennas=None):
         if n_ant > 64:
             print(f"Note: Only plotting first 64 of {n_ant} antennas")
     
+    # Plot every ~10th antenna in the line plots
+    plotted_antennas = antennas[::max(1, len(antennas)//10)]
+    
     # Create time axis
     if time_axis and times is not None:
         time_vals = times
@@ -235,54 +487,42 @@ def plot_solutions(solution_file, output_dir=None, antennas=None):
         # XX amplitude
         if n_pol >= 1:
             ax = axes[0, 0]
-            for ant_idx in antennas[::max(1, len(antennas)//10)]:  # Plot every ~10th antenna
-                ant_name = antenna_names[ant_idx] if antenna_names else f"Ant{ant_idx}"
-                ax.plot(time_vals, amplitudes[:, ant_idx, 0, 0], label=ant_name, alpha=0.7)
+            _plot_antenna_lines(ax, time_vals, amplitudes[:, :, 0, 0], plotted_antennas,
+                                antenna_names, legend=len(antennas) <= 10)
             ax.set_xlabel(time_label)
             ax.set_ylabel('Amplitude')
             ax.set_title('XX Amplitude')
             ax.grid(True)
-            if len(antennas) <= 10:
-                ax.legend()
         
         # YY amplitude
         if n_pol >= 2:
             ax = axes[0, 1]
-            for ant_idx in antennas[::max(1, len(antennas)//10)]:
-                ant_name = antenna_names[ant_idx] if antenna_names else f"Ant{ant_idx}"
-                ax.plot(time_vals, amplitudes[:, ant_idx, 0, -1], label=ant_name, alpha=0.7)
+            _plot_antenna_lines(ax, time_vals, amplitudes[:, :, 0, -1], plotted_antennas,
+                                antenna_names, legend=len(antennas) <= 10)
             ax.set_xlabel(time_label)
             ax.set_ylabel('Amplitude')
             ax.set_title('YY Amplitude')
             ax.grid(True)
-            if len(antennas) <= 10:
-                ax.legend()
         
         # XX phase
         if n_pol >= 1:
             ax = axes[1, 0]
-            for ant_idx in antennas[::max(1, len(antennas)//10)]:
-                ant_name = antenna_names[ant_idx] if antenna_names else f"Ant{ant_idx}"
-                ax.plot(time_vals, np.degrees(phases[:, ant_idx, 0, 0]), label=ant_name, alpha=0.7)
+            _plot_antenna_lines(ax, time_vals, np.degrees(phases[:, :, 0, 0]), plotted_antennas,
+                                antenna_names, legend=len(antennas) <= 10)
             ax.set_xlabel(time_label)
             ax.set_ylabel('Phase (degrees)')
             ax.set_title('XX Phase')
             ax.grid(True)
-            if len(antennas) <= 10:
-                ax.legend()
         
         # YY phase
         if n_pol >= 2:
             ax = axes[1, 1]
-            for ant_idx in antennas[::max(1, len(antennas)//10)]:
-                ant_name = antenna_names[ant_idx] if antenna_names else f"Ant{ant_idx}"
-                ax.plot(time_vals, np.degrees(phases[:, ant_idx, 0, -1]), label=ant_name, alpha=0.7)
+            _plot_antenna_lines(ax, time_vals, np.degrees(phases[:, :, 0, -1]), plotted_antennas,
+                                antenna_names, legend=len(antennas) <= 10)
             ax.set_xlabel(time_label)
             ax.set_ylabel('Phase (degrees)')
             ax.set_title('YY Phase')
             ax.grid(True)
-            if len(antennas) <= 10:
-                ax.legend()
         
         # Remove empty subplots
         if n_pol < 2:
@@ -297,49 +537,47 @@ def plot_solutions(solution_file, output_dir=None, antennas=None):
         # XX polarization
         if n_pol >= 1:
             ax = axes[0]
-            for ant_idx in antennas[::max(1, len(antennas)//10)]:
-                ant_name = antenna_names[ant_idx] if antenna_names else f"Ant{ant_idx}"
-                ax.plot(time_vals, gains[:, ant_idx, 0, 0], label=ant_name, alpha=0.7)
+            _plot_antenna_lines(ax, time_vals, gains[:, :, 0, 0], plotted_antennas,
+                                antenna_names, legend=len(antennas) <= 10)
             ax.set_xlabel(time_label)
             ax.set_ylabel(f'{solution_type.title()} Solutions')
             ax.set_title('XX Polarization')
             ax.grid(True)
-            if len(antennas) <= 10:
-                ax.legend()
         
         # YY polarization
         if n_pol >= 2:
             ax = axes[1]
-            for ant_idx in antennas[::max(1, len(antennas)//10)]:
-                ant_name = antenna_names[ant_idx] if antenna_names else f"Ant{ant_idx}"
-                ax.plot(time_vals, gains[:, ant_idx, 0, -1], label=ant_name, alpha=0.7)
+            _plot_antenna_lines(ax, time_vals, gains[:, :, 0, -1], plotted_antennas,
+                                antenna_names, legend=len(antennas) <= 10)
             ax.set_xlabel(time_label)
             ax.set_ylabel(f'{solution_type.title()} Solutions')
             ax.set_title('YY Polarization')
             ax.grid(True)
-            if len(antennas) <= 10:
-                ax.legend()
         
         # Remove empty subplot if only one polarization
         if n_pol < 2:
             axes[1].remove()
     
-    plt.tight_layout()
+    _adjust_layout(fig, nrows=axes.shape[0] if axes.ndim == 2 else 1)
     
     # Save plot
     output_file = output_dir / f"{solution_path.stem}_solutions.png"
-    plt.savefig(output_file, dpi=150, bbox_inches='tight')
+    plt.savefig(output_file, dpi=150)
     print(f"Solutions plot saved to: {output_file}")
     
-    # Show statistics
+    # Show statistics (over all channels, not just the plotted one)
     print(f"\nSolution statistics:")
     if is_complex:
-        print(f"  Amplitude range: {np.nanmin(amplitudes):.3f} to {np.nanmax(amplitudes):.3f}")
-        print(f"  Phase range: {np.degrees(np.nanmin(phases)):.1f}° to {np.degrees(np.nanmax(phases)):.1f}°")
+        # A complex gain is NaN exactly when its amplitude is
+        amp_min, amp_max, nan_count, n_total = amp_stats
+        phase_min, phase_max, _, _ = phase_stats
+        print(f"  Amplitude range: {amp_min:.3f} to {amp_max:.3f}")
+        print(f"  Phase range: {np.degrees(phase_min):.1f}° to {np.degrees(phase_max):.1f}°")
     else:
-        print(f"  Value range: {np.nanmin(gains):.3e} to {np.nanmax(gains):.3e}")
+        val_min, val_max, nan_count, n_total = val_stats
+        print(f"  Value range: {val_min:.3e} to {val_max:.3e}")
     
-    flagged_fraction = np.isnan(gains).sum() / gains.size
+    flagged_fraction = nan_count / n_total
     print(f"  Flagged solutions: {flagged_fraction*100:.1f}%")
     
     plt.close()
@@ -353,6 +591,12 @@ def plot_antenna_summary(gains, antenna_names, solution_path, output_dir, is_com
     
     n_time, n_ant, n_freq, n_pol = gains.shape
     
+    # Bin the time axis when it has far more samples than the panels have
+    # pixels; the extent keeps the axis in time steps
+    fig_width_pixels = 15 * 150
+    bin_factor = n_time // fig_width_pixels if n_time > 2 * fig_width_pixels else 1
+    extent = (-0.5, n_time - 0.5, -0.5, n_ant - 0.5)
+    
     if is_complex:
         amplitudes = np.abs(gains)
         phases = np.angle(gains)
@@ -362,7 +606,8 @@ def plot_antenna_summary(gains, antenna_names, solution_path, output_dir, is_com
         
         # XX amplitude summary
         ax = axes[0, 0]
-        im = ax.imshow(amplitudes[:, :, 0, 0].T, aspect='auto', cmap='viridis', origin='lower')
+        im = ax.imshow(_summary_panel(amplitudes[:, :, 0, 0], bin_factor),
+                       extent=extent, aspect='auto', cmap='viridis', origin='lower')
         ax.set_xlabel('Time step')
         ax.set_ylabel('Antenna')
         ax.set_title('XX Amplitude')
@@ -371,7 +616,8 @@ def plot_antenna_summary(gains, antenna_names, solution_path, output_dir, is_com
         # YY amplitude summary
         if n_pol >= 2:
             ax = axes[0, 1]
-            im = ax.imshow(amplitudes[:, :, 0, -1].T, aspect='auto', cmap='viridis', origin='lower')
+            im = ax.imshow(_summary_panel(amplitudes[:, :, 0, -1], bin_factor),
+                           extent=extent, aspect='auto', cmap='viridis', origin='lower')
             ax.set_xlabel('Time step')
             ax.set_ylabel('Antenna')
             ax.set_title('YY Amplitude')
@@ -379,7 +625,8 @@ def plot_antenna_summary(gains, antenna_names, solution_path, output_dir, is_com
         
         # XX phase summary
         ax = axes[1, 0]
-        im = ax.imshow(np.degrees(phases[:, :, 0, 0]).T, aspect='auto', cmap='RdBu_r', origin='lower')
+        im = ax.imshow(_summary_panel(phases[:, :, 0, 0], bin_factor, phase=True),
+                       extent=extent, aspect='auto', cmap='RdBu_r', origin='lower')
         ax.set_xlabel('Time step')
         ax.set_ylabel('Antenna')
         ax.set_title('XX Phase (degrees)')
@@ -388,7 +635,8 @@ def plot_antenna_summary(gains, antenna_names, solution_path, output_dir, is_com
         # YY phase summary
         if n_pol >= 2:
             ax = axes[1, 1]
-            im = ax.imshow(np.degrees(phases[:, :, 0, -1]).T, aspect='auto', cmap='RdBu_r', origin='lower')
+            im = ax.imshow(_summary_panel(phases[:, :, 0, -1], bin_factor, phase=True),
+                           extent=extent, aspect='auto', cmap='RdBu_r', origin='lower')
             ax.set_xlabel('Time step')
             ax.set_ylabel('Antenna')
             ax.set_title('YY Phase (degrees)')
@@ -405,7 +653,8 @@ def plot_antenna_summary(gains, antenna_names, solution_path, output_dir, is_com
         
         # XX summary
         ax = axes[0]
-        im = ax.imshow(gains[:, :, 0, 0].T, aspect='auto', cmap='viridis', origin='lower')
+        im = ax.imshow(_summary_panel(gains[:, :, 0, 0], bin_factor),
+                       extent=extent, aspect='auto', cmap='viridis', origin='lower')
         ax.set_xlabel('Time step')
         ax.set_ylabel('Antenna')
         ax.set_title('XX Polarization')
@@ -414,7 +663,8 @@ def plot_antenna_summary(gains, antenna_names, solution_path, output_dir, is_com
         # YY summary
         if n_pol >= 2:
             ax = axes[1]
-            im = ax.imshow(gains[:, :, 0, -1].T, aspect='auto', cmap='viridis', origin='lower')
+            im = ax.imshow(_summary_panel(gains[:, :, 0, -1], bin_factor),
+                           extent=extent, aspect='auto', cmap='viridis', origin='lower')
             ax.set_xlabel('Time step')
             ax.set_ylabel('Antenna')
             ax.set_title('YY Polarization')
@@ -422,11 +672,11 @@ def plot_antenna_summary(gains, antenna_names, solution_path, output_dir, is_com
         else:
             axes[1].remove()
     
-    plt.tight_layout()
+    _adjust_layout(fig, nrows=axes.shape[0] if axes.ndim == 2 else 1)
     
     # Save summary plot
     output_file = output_dir / f"{solution_path.stem}_antenna_summary.png"
-    plt.savefig(output_file, dpi=150, bbox_inches='tight')
+    plt.savefig(output_file, dpi=150)
     print(f"Antenna summary plot saved to: {output_file}")
     
     plt.close()
@@ -438,6 +688,8 @@ def main():
     parser.add_argument("-o", "--output-dir", help="Output directory for plots")
     parser.add_argument("-a", "--antennas", nargs="+", type=int, 
                        help="Antenna indices to plot (default: first 64)")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                       help="Print the HDF5 file structure")
     
     args = parser.parse_args()
     
@@ -445,7 +697,7 @@ def main():
         print(f"Error: Solution file not found: {args.solution_file}")
         sys.exit(1)
     
-    plot_solutions(args.solution_file, args.output_dir, args.antennas)
+    plot_solutions(args.solution_file, args.output_dir, args.antennas, verbose=args.verbose)
 
 if __name__ == "__main__":
     main()
@@ -4,18 +4,23 @@ Minimal script to run wsclean imaging using podman
 Uses default parameters optimized for LWA data processing
 """
 
+import argparse
 import subprocess
 import sys
 import os
 from pathlib import Path
 
-def run_wsclean_imaging(input_ms, output_prefix="image"):
+def run_wsclean_imaging(input_ms, output_prefix="image", no_update_model=True, temp_dir=None,
+                        channels_out=None):
     """
     Run wsclean imaging with specified parameters
     
     Args:
         input_ms: Path to input measurement set
         output_prefix: Prefix for output image files
+        no_update_model: Pass -no-update-model-required (skip MODEL_DATA bookkeeping)
+        temp_dir: Host scratch directory for wsclean temporary files, e.g. on /dev/shm (optional)
+        channels_out: Number of output channel images (optional, wsclean default is 1)
     """
     
     input_path = Path(input_ms)
@@ -27,6 +32,9 @@ def run_wsclean_imaging(input_ms, output_prefix="image"):
     # Default parameters
     default_kwargs = {
         'j': '8',                           # number of threads
+        'parallel-gridding': '4',           # grid w-layers in parallel
+        # No 'parallel-deconvolution' on purpose: it can leave artifacts at
+        # sub-image edges (fixed only in newer wsclean, MR 344)
         'mem': '2',                         # fraction of memory usage
         'weight': 'uniform',                # weighting scheme
         'no-dirty': '',                     # don't save dirty image
@@ -45,6 +53,11 @@ def run_wsclean_imaging(input_ms, output_prefix="image"):
         'quiet': '',                        # stop printing to stdout
     }
     
+    if not no_update_model:
+        del default_kwargs['no-update-model-required']
+    if channels_out is not None and int(channels_out) > 1:
+        default_kwargs['channels-out'] = str(int(channels_out))
+    
     # Image size and pixel scale
     size = 4096
     pixel_scale = "2arcmin"  # Pixel scale for LWA data
@@ -61,6 +74,17 @@ def run_wsclean_imaging(input_ms, output_prefix="image"):
     # Add output name
     wsclean_cmd.extend(["-name", output_prefix])
     
+    # The w-gridder is faster than w-stacking for large images
+    if size >= 5000:
+        wsclean_cmd.append("-use-wgridder")
+    
+    # Scratch files go to temp_dir, mounted at the same (absolute) path in
+    # the container: a relative path would be taken as a named volume
+    if temp_dir is not None:
+        temp_dir = Path(temp_dir).resolve()
+        temp_dir.mkdir(parents=True, exist_ok=True)
+        wsclean_cmd.extend(["-temp-dir", str(temp_dir)])
+    
     # Add all default parameters
     for key, value in default_kwargs.items():
         if value == '':  # Boolean flags
@@ -83,6 +107,10 @@ def run_wsclean_imaging(input_ms, output_prefix="image"):
     podman_cmd = [
         "podman", "run", "--rm",
         "-v", f"{input_dir}:/data",
+    ]
+    if temp_dir is not None:
+        podman_cmd.extend(["-v", f"{temp_dir}:{temp_dir}"])
+    podman_cmd += [
         "-w", "/data",
         "astronrd/linc:latest"
     ] + wsclean_cmd
@@ -92,6 +120,15 @@ def run_wsclean_imaging(input_ms, output_prefix="image"):
     
     print(f"Command: {' '.join(wsclean_cmd)}")
     
+    # Snapshot the prefix-matching files so only those written by this run
+    # (new or rewritten) are listed afterwards
+    def _output_mtimes():
+        with os.scandir(output_dir) as entries:
+            return {e.name: e.stat().st_mtime_ns for e in entries
+                    if e.name.startswith(output_prefix)}
+    
+    existing_files = _output_mtimes()
+    
     try:
         # Run wsclean
         result = subprocess.run(podman_cmd, check=True, text=True)
@@ -99,8 +136,9 @@ def run_wsclean_imaging(input_ms, output_prefix="image"):
         
         # List generated files
         print("\nGenerated files:")
-        for file in output_dir.glob(f"{output_prefix}*"):
-            print(f"  {file.name}")
+        for name, mtime_ns in sorted(_output_mtimes().items()):
+            if existing_files.get(name) != mtime_ns:
+                print(f"  {name}")
         
     except subprocess.CalledProcessError as e:
         print(f"WSClean failed with exit code {e.returncode}")
@@ -108,15 +146,24 @@ def run_wsclean_imaging(input_ms, output_prefix="image"):
 
 def main():
     """Main function"""
-    if len(sys.argv) < 2:
-        print("Usage: python3 run_wsclean_imaging.py <input_ms> [output_prefix]")
-        print("Example: python3 run_wsclean_imaging.py /fast/peijinz/agile_proc/testdata/slow/flagged_avg.ms")
-        sys.exit(1)
-    
-    input_ms = sys.argv[1]
-    output_prefix = sys.argv[2] if len(sys.argv) > 2 else "image"
-    
-    run_wsclean_imaging(input_ms, output_prefix)
+    parser = argparse.ArgumentParser(
+        description="Run wsclean imaging using podman",
+        epilog="Example: python3 run_wsclean_imaging.py /fast/peijinz/agile_proc/testdata/slow/flagged_avg.ms")
+    parser.add_argument("input_ms", help="Path to input measurement set")
+    parser.add_argument("output_prefix", nargs="?", default="image",
+                        help="Prefix for output image files (default: image)")
+    parser.add_argument("--no-update-model", dest="no_update_model", action="store_true",
+                        default=True, help="Pass -no-update-model-required to wsclean (default)")
+    parser.add_argument("--update-model", dest="no_update_model", action="store_false",
+                        help="Let wsclean update MODEL_DATA bookkeeping")
+    parser.add_argument("--temp-dir", help="Scratch directory for wsclean temporary files (e.g. /dev/shm/...)")
+    parser.add_argument("--channels-out", type=int, help="Number of output channel images")
+    
+    args = parser.parse_args()
+    
+    run_wsclean_imaging(args.input_ms, args.output_prefix,
+                        no_update_model=args.no_update_model, temp_dir=args.temp_dir,
+                        channels_out=args.channels_out)
 
 if __name__ == "__main__":
     main()
@@ -7,7 +7,6 @@ Uses the 'subtract' operation to remove model sources from visibilities.
 import subprocess
 import sys
 from pathlib import Path
-import tempfile
 
 def subtract_sources_dp3(ms_file, source_file, output_ms=None):
     """
@@ -41,98 +40,58 @@ def subtract_sources_dp3(ms_file, source_file, output_ms=None):
     # or DP3 can handle WSClean format directly
     
     
-    # Find common parent directory for mounting
+    # Mount each file's own (symlink-resolved) directory, not a common
+    # parent: MS and source list read-only as /in and /src, output as /out
     ms_abs = ms_path.resolve()
     source_abs = source_path.resolve()
     output_abs = output_ms.resolve()
     
-    # Find common parent
-    common_parts = []
-    ms_parts = ms_abs.parts
-    source_parts = source_abs.parts
-    output_parts = output_abs.parts
-    
-    for i in range(min(len(ms_parts), len(source_parts), len(output_parts))):
-        if ms_parts[i] == source_parts[i] == output_parts[i]:
-            common_parts.append(ms_parts[i])
-        else:
-            break
-    
-    if not common_parts:
-        # Fallback: use root directory
-        common_parent = Path("/")
-    else:
-        common_parent = Path(*common_parts)
-    
     print(f"Input MS: {ms_abs}")
     print(f"Source file: {source_abs}")
     print(f"Output MS: {output_abs}")
-    print(f"Common parent for mounting: {common_parent}")
     
-    # Calculate relative paths from common parent
-    ms_rel = ms_abs.relative_to(common_parent)
-    source_rel = source_abs.relative_to(common_parent)
-    output_rel = output_abs.relative_to(common_parent)
-    
-    # Update parset with relative paths
     parset_content = f"""
-msin = /data/{ms_rel}
-msout = /data/{output_rel}
+msin = /in/{ms_abs.name}
+msout = /out/{output_abs.name}
 
 steps = [predict]
 
 predict.type = predict
-predict.sourcedb = /data/{source_rel}
+predict.sourcedb = /src/{source_abs.name}
 predict.operation = subtract
 """
     
-    # Write parset to temporary file
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.parset', delete=False) as f:
-        f.write(parset_content)
-        parset_file = Path(f.name)
-    
-    try:
-        print(f"\nDP3 Parset contents:")
-        print(parset_content)
-        
-        # Copy parset to common parent for container access
-        container_parset = common_parent / "subtract_sources.parset"
-        with open(container_parset, 'w') as f:
-            f.write(parset_content)
-        
-        # Run DP3 in container
-        cmd = [
-            "podman", "run", "--rm",
-            "-v", f"{common_parent}:/data",
-            "-w", "/data",
-            "astronrd/linc:latest",
-            "DP3", "subtract_sources.parset"
-        ]
-        
-        print(f"\nRunning DP3 command:")
-        print(" ".join(cmd))
-        print()
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode != 0:
-            print("DP3 failed!")
-            print("STDOUT:", result.stdout)
-            print("STDERR:", result.stderr)
-            raise RuntimeError(f"DP3 failed with exit code {result.returncode}")
-        
-        print("DP3 completed successfully!")
+    print(f"\nDP3 Parset contents:")
+    print(parset_content)
+    
+    # Run DP3 in container; the parset is streamed over stdin, so no parset
+    # file is written (and none can clash between concurrent runs)
+    cmd = [
+        "podman", "run", "--rm", "-i",
+        "-v", f"{ms_abs.parent}:/in:ro",
+        "-v", f"{source_abs.parent}:/src:ro",
+        "-v", f"{output_abs.parent}:/out",
+        "-w", "/out",
+        "astronrd/linc:latest",
+        "DP3", "/dev/stdin"
+    ]
+    
+    print(f"\nRunning DP3 command:")
+    print(" ".join(cmd))
+    print()
+    
+    result = subprocess.run(cmd, input=parset_content, capture_output=True, text=True)
+    
+    if result.returncode != 0:
+        print("DP3 failed!")
         print("STDOUT:", result.stdout)
-        
-        # Clean up parset file
-        container_parset.unlink()
-        
-        return str(output_abs)
-        
-    finally:
-        # Clean up temporary parset
-        if parset_file.exists():
-            parset_file.unlink()
+        print("STDERR:", result.stderr)
+        raise RuntimeError(f"DP3 failed with exit code {result.returncode}")
+    
+    print("DP3 completed successfully!")
+    print("STDOUT:", result.stdout)
+    
+    return str(output_abs)
 
 def main():
     """Main function for command line usage."""
@@ -3,7 +3,10 @@ Calculate angular distances between sources in a WSClean sources file
 and a target RA/DEC position using astropy.
 """
 
+import os
+from functools import lru_cache
 from pathlib import Path
+import numpy as np
 from astropy.coordinates import SkyCoord, EarthLocation, get_body
 from astropy.time import Time
 import astropy.units as u
@@ -16,26 +19,60 @@ def parse_wsclean_coordinates(ra_str, dec_str):
     return SkyCoord(ra_str, dec_str_astropy, unit=(u.hourangle, u.deg))
 
 
+def parse_source_lines(lines):
+    """Parse WSClean source-list lines (header excluded) in one vectorized pass.
+    
+    Returns:
+        (rows, coords): rows is a list of (line index, split fields) for the
+        parsed sources, coords a SkyCoord array with one entry per row.
+        Lines with fewer than 4 fields or unparseable positions are skipped.
+    """
+    rows = []
+    for i, line in enumerate(lines):
+        parts = line.strip().split(',')
+        if len(parts) >= 4:
+            rows.append((i, parts))
+    if not rows:
+        return rows, SkyCoord(ra=np.array([])*u.deg, dec=np.array([])*u.deg)
+    
+    try:
+        # All positions in a single SkyCoord call instead of one per source
+        coords = SkyCoord([parts[2] for _, parts in rows],
+                          [parts[3].replace('.', ':', 2) for _, parts in rows],
+                          unit=(u.hourangle, u.deg))
+    except (ValueError, IndexError):
+        # A malformed entry somewhere: parse row by row, dropping bad rows
+        good, ra_deg, dec_deg = [], [], []
+        for row in rows:
+            try:
+                coord = parse_wsclean_coordinates(row[1][2], row[1][3])
+            except (ValueError, IndexError):
+                continue
+            good.append(row)
+            ra_deg.append(coord.ra.deg)
+            dec_deg.append(coord.dec.deg)
+        rows = good
+        coords = SkyCoord(ra=np.array(ra_deg)*u.deg, dec=np.array(dec_deg)*u.deg)
+    return rows, coords
+
+
 def load_wsclean_sources(filename):
     """Load sources from WSClean sources file."""
-    sources = []
     with open(filename, 'r') as f:
-        for line in f.readlines()[1:]:  # Skip header
-            parts = line.strip().split(',')
-            if len(parts) < 4:
-                continue
-            
-            name, source_type, ra_str, dec_str = parts[:4]
+        lines = f.readlines()[1:]  # Skip header
+    rows, coords = parse_source_lines(lines)
+    
+    sources = []
+    ra_deg, dec_deg = coords.ra.deg, coords.dec.deg
+    for k, (_, parts) in enumerate(rows):
+        try:
             flux = float(parts[4]) if len(parts) > 4 else 0.0
-            
-            try:
-                coord = parse_wsclean_coordinates(ra_str, dec_str)
-                sources.append({
-                    'name': name, 'coord': coord, 'flux': flux,
-                    'ra_deg': coord.ra.deg, 'dec_deg': coord.dec.deg
-                })
-            except (ValueError, IndexError):
-                continue
+        except ValueError:
+            continue
+        sources.append({
+            'name': parts[0], 'coord': coords[k], 'flux': flux,
+            'ra_deg': ra_deg[k], 'dec_deg': dec_deg[k]
+        })
     return sources
 
 
@@ -55,20 +92,34 @@ def distance_to_src_list(sourcelist_fname, ra_deg, dec_deg):
     
     target_coord = SkyCoord(ra=ra_deg*u.deg, dec=dec_deg*u.deg)
     sources = load_wsclean_sources(sourcelist_file)
+    if not sources:
+        return []
     
-    results = []
-    for source in sources:
-        sep = source['coord'].separation(target_coord)
-        results.append({
-            **source,  # Include all source data
-            'distance_deg': sep.deg
-        })
+    # One vectorized separation for all sources
+    coords = SkyCoord(ra=np.array([s['ra_deg'] for s in sources])*u.deg,
+                      dec=np.array([s['dec_deg'] for s in sources])*u.deg)
+    seps = coords.separation(target_coord).deg
     
-    return results
+    return [{**source, 'distance_deg': sep}  # Include all source data
+            for source, sep in zip(sources, seps)]
 
 
 def get_time_mjd(msname):
-    """Get the time in Modified Julian Days from a MS file."""
+    """Get the time in Modified Julian Days from a MS file.
+    
+    The result is cached per MS and invalidated when its OBSERVATION table
+    is modified, so repeated calls do not reopen the table.
+    """
+    obs_table = os.path.join(msname, 'OBSERVATION')
+    with os.scandir(obs_table) as entries:
+        mtime_ns = max((e.stat().st_mtime_ns for e in entries),
+                       default=os.stat(obs_table).st_mtime_ns)
+    return _read_time_mjd(os.path.abspath(msname), mtime_ns)
+
+
+@lru_cache(maxsize=128)
+def _read_time_mjd(msname, mtime_ns):
+    """Read the observation start time (MJD), cached per (path, mtime)."""
     tb = table()
     tb.open(msname+'/OBSERVATION')
     start_mjd = tb.getcol('TIME_RANGE')[0][0] / 86400.0  
@@ -77,25 +128,35 @@ def get_time_mjd(msname):
 
 
 
+@lru_cache(maxsize=None)
+def _site_location(observatory):
+    """EarthLocation of an observatory, looked up in the site registry once."""
+    return EarthLocation.of_site(observatory)
+
+
 def get_Sun_RA_DEC(time_mjd, observatory='OVRO'):
-    """Get the RA and DEC of the Sun at a given time.
+    """Get the RA and DEC of the Sun at a given time or times.
+    
+    A whole array of times is evaluated in one vectorized ephemeris call.
     
     Args:
-        time_mjd (float): Time in Modified Julian Days
+        time_mjd (float or array): Time(s) in Modified Julian Days
         observatory (str): Observatory name for astropy EarthLocation
     
     Returns:
-        tuple: (ra_deg, dec_deg) Sun coordinates in degrees
+        tuple: (ra_deg, dec_deg) Sun coordinates in degrees, scalars or
+        arrays matching time_mjd
     
     Example:
         >>> ra, dec = get_Sun_RA_DEC(59000.5)  # MJD
         >>> print(f"Sun at RA={ra:.4f}°, DEC={dec:.4f}°")
+        >>> ras, decs = get_Sun_RA_DEC(np.array([59000.5, 59000.6]))
     """
-    # Convert MJD to astropy Time object
-    time = Time(time_mjd, format='mjd')
+    # Convert MJD(s) to astropy Time object
+    time = Time(time_mjd, format='mjd', scale='utc')
     
     # Get observatory location
-    location = EarthLocation.of_site(observatory)
+    location = _site_location(observatory)
     
     # Get Sun position as seen from the observatory
     sun_coord = get_body('sun', time, location)
@@ -113,12 +174,19 @@ def mask_far_Sun_sources(sourcelis_fname, fname_out, ra_deg, dec_deg, distance_d
     source NOT within distance_deg from the Sun.
     """
 
-    dist_to_sun = distance_to_src_list(sourcelis_fname, ra_deg, dec_deg)
-    sources_to_remove = [source['name'] for source in dist_to_sun if source['distance_deg'] <= distance_deg]
+    sourcelist_file = Path(sourcelis_fname)
+    if not sourcelist_file.exists():
+        raise FileNotFoundError(f"Sources file {sourcelist_file} not found")
     
-    with open(sourcelis_fname, 'r') as f:
+    with open(sourcelist_file, 'r') as f:
         lines = f.readlines()
 
+    # Distances of all sources to the Sun in one array operation
+    rows, coords = parse_source_lines(lines[1:])
+    target_coord = SkyCoord(ra=ra_deg*u.deg, dec=dec_deg*u.deg)
+    near = coords.separation(target_coord).deg <= distance_deg
+    sources_to_remove = {parts[0] for (_, parts), is_near in zip(rows, near) if is_near}
+
     # remove the sources from the output file
     with open(fname_out, 'w') as f:
         for i, line in enumerate(lines):
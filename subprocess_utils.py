@@ -0,0 +1,24 @@
+"""
+Subprocess helpers shared by the pipeline and the dev_src scripts
+"""
+import subprocess
+import sys
+from collections import deque
+
+def run_streaming(cmd, tail_lines=20, echo=True):
+    """
+    Run cmd, echoing its combined stdout/stderr as it is produced
+    
+    Only the last tail_lines lines are kept in memory; they are attached to
+    the CalledProcessError raised on a non-zero exit. With echo=False the
+    output is only kept for that tail (e.g. for verbose wsclean logs).
+    """
+    tail = deque(maxlen=tail_lines)
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                          text=True, bufsize=1) as proc:
+        for line in proc.stdout:
+            if echo:
+                sys.stdout.write(line)
+            tail.append(line)
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, output="".join(tail))
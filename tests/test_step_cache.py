@@ -0,0 +1,66 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from step_cache import memoized_step
+
+
+class MemoizedStepTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp = Path(self._tmp.name)
+        self.input_ms = self.tmp / "raw.ms"
+        self.input_ms.mkdir()
+        (self.input_ms / "table.f0").write_bytes(b"data")
+        (self.input_ms / "table.lock").write_bytes(b"lock")
+        self.output_ms = self.tmp / "out.ms"
+        self.calls = 0
+
+        @memoized_step("test")
+        def step(input_ms, output_ms, option=1):
+            self.calls += 1
+            Path(output_ms).mkdir()
+            (Path(output_ms) / "table.f0").write_bytes(b"out")
+            # casacore rewrites the lock file of every table it opens
+            (Path(input_ms) / "table.lock").write_bytes(b"lock")
+            return str(output_ms)
+
+        self.step = step
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _touch(self, path):
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+    def test_second_call_is_skipped(self):
+        self.step(self.input_ms, self.output_ms)
+        self._touch(self.input_ms / "table.lock")
+        self.step(self.input_ms, self.output_ms)
+        self.assertEqual(self.calls, 1)
+
+    def test_changed_input_reruns(self):
+        self.step(self.input_ms, self.output_ms)
+        self._touch(self.input_ms / "table.f0")
+        self.step(self.input_ms, self.output_ms)
+        self.assertEqual(self.calls, 2)
+
+    def test_is_current(self):
+        self.assertFalse(self.step.is_current(self.input_ms, self.output_ms))
+        self.step(self.input_ms, self.output_ms)
+        self.assertTrue(self.step.is_current(self.input_ms, self.output_ms))
+        self.assertFalse(self.step.is_current(self.input_ms, self.output_ms, option=2))
+        self.assertEqual(self.calls, 1)
+
+    def test_changed_argument_reruns(self):
+        self.step(self.input_ms, self.output_ms, option=1)
+        self.step(self.input_ms, self.output_ms, option=2)
+        self.assertEqual(self.calls, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,10 +1,27 @@
+import os
+from functools import lru_cache
 import numpy as np
 from casatools import table
 
 
 def get_freq_from_ms(msname):
+    """
+    Median channel frequency of a MS, in Hz
+
+    Cached per MS and invalidated when its SPECTRAL_WINDOW table is
+    modified, so repeated imaging runs do not reopen the table.
+    """
+    spw_table = os.path.join(str(msname), 'SPECTRAL_WINDOW')
+    with os.scandir(spw_table) as entries:
+        mtime_ns = max((e.stat().st_mtime_ns for e in entries),
+                       default=os.stat(spw_table).st_mtime_ns)
+    return _read_freq(os.path.abspath(spw_table), mtime_ns)
+
+@lru_cache(maxsize=128)
+def _read_freq(spw_table, mtime_ns):
+    """Read the median channel frequency, cached per (path, mtime)"""
     tb = table()
-    tb.open(f"{msname}/SPECTRAL_WINDOW")
+    tb.open(spw_table)
     chan_freqs = tb.getcol("CHAN_FREQ")             # per-channel frequencies
     tb.close()
     return np.median(chan_freqs.ravel())
@@ -35,7 +52,7 @@ def find_smallest_fftw_sz_number(n):
 
 def make_wsclean_cmd(msfile, imagename, size:int =4096, scale='2arcmin', fast_vis=False, field=None, 
             predict=True, auto_pix_fov = False, telescope_size = 3200, im_fov=200*3600*2/np.pi, pix_scale_factor=1.5,
-            **kwargs):  
+            freq=None, **kwargs):  
     """
     Wrapper for imaging using wsclean, use the parameter of wsclean in args. 
     
@@ -57,6 +74,7 @@ def make_wsclean_cmd(msfile, imagename, size:int =4096, scale='2arcmin', fast_vi
     :param auto_pix_fov: if True, automatically set the pixel scale to match the field of view
     :param telescope_size: size of the telescope in meters, default 3200 (OVRO-LWA)
     :param im_fov: field of view of the image in arcseconds, default 182*3600*2/np.pi (full sky+ 2deg) scaling down by 2/pi
+    :param freq: frequency in Hz for auto_pix_fov, default None (read from msfile)
     :param j: number of threads, default 4
     :param mem: fraction of max memory usage, default 2 
     :param weight: weighting scheme, default uniform
@@ -97,7 +115,8 @@ def make_wsclean_cmd(msfile, imagename, size:int =4096, scale='2arcmin', fast_vi
         default_kwargs['weight']='briggs 0.5'
 
     if auto_pix_fov:
-        freq = get_freq_from_ms(msfile)
+        if freq is None:
+            freq = get_freq_from_ms(msfile)
         scale_num = 1.22*(3e8/freq)/telescope_size * 180/np.pi*3600 / pix_scale_factor
         scale = str(scale_num/60)+'arcmin'
         size = find_smallest_fftw_sz_number(im_fov/scale_num)